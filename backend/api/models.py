@@ -29,6 +29,18 @@ class DraftProcessRequest(BaseModel):
     assistant_draft: str = Field(..., description="助手生成的草稿")
 
 
+class DraftItem(BaseModel):
+    """批量草稿中的单条草稿"""
+    user_message: str = Field(..., description="用户消息")
+    assistant_draft: str = Field(..., description="助手生成的草稿")
+
+
+class DraftBatchRequest(BaseModel):
+    """批量草稿处理请求"""
+    story_id: str = Field(..., description="剧本ID")
+    drafts: List[DraftItem] = Field(..., min_length=1, description="按顺序处理的草稿列表")
+
+
 class DraftProcessResponse(BaseModel):
     """草稿处理响应"""
     final_action: str = Field(..., description="最终动作：PASS, AUTO_FIX, REWRITE, ASK_USER")
@@ -38,3 +50,15 @@ class DraftProcessResponse(BaseModel):
     questions: Optional[List[str]] = Field(default=None, description="澄清问题（ASK_USER 时提供）")
     violations: Optional[List[Dict[str, Any]]] = Field(default=None, description="违反的规则列表（用于调试）")
 
+
+
+class DraftBatchResponse(BaseModel):
+    """批量草稿处理响应
+
+    某条草稿处理失败时不再整体报 500：results 保留失败前已完成
+    （且已落盘）的结果，failed_index/error 标出失败位置和原因，
+    客户端可从 failed_index 起重新提交剩余草稿。
+    """
+    results: List[DraftProcessResponse] = Field(..., description="与请求顺序一致的处理结果列表（失败时为失败前已完成的部分）")
+    failed_index: Optional[int] = Field(default=None, description="处理失败的草稿下标（从 0 开始，全部成功时为 None）")
+    error: Optional[str] = Field(default=None, description="失败原因（全部成功时为 None）")
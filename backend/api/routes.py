@@ -2,6 +2,7 @@
 FastAPI 路由定义
 """
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from typing import List
@@ -18,6 +19,8 @@ from .models import (
     RAGQueryResponse,
     DraftProcessRequest,
     DraftProcessResponse,
+    DraftBatchRequest,
+    DraftBatchResponse,
 )
 
 
@@ -28,6 +31,10 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# 响应 gzip 压缩：/state 与 /draft/process 返回的大状态 JSON
+# 压缩后通常缩小数倍；1KB 以下的小响应不压，省去无谓的 CPU 开销
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # 挂载静态文件（用于测试页面）
 static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
@@ -75,7 +82,8 @@ async def get_state(
         CanonicalState: 当前状态
     """
     try:
-        state = await repo.get_state(story_id)
+        # 只读端点：状态写入时已完整校验，读取走免校验快路径
+        state = await repo.get_state(story_id, trusted=True)
     except ValueError as e:
         # State 损坏，尝试重新初始化
         error_msg = str(e)
@@ -107,7 +115,7 @@ async def rag_query(
         RAGQueryResponse: 检索结果
     """
     try:
-        results = rag_service.query(
+        results = await rag_service.aquery(
             story_id=request.story_id,
             query_text=request.query,
             top_k=request.top_k,
@@ -150,15 +158,16 @@ async def rag_query(
         )
 
 
-@app.post("/draft/process", response_model=DraftProcessResponse)
-async def process_draft(
-    request: DraftProcessRequest,
-    repo: Repository = Depends(get_repository),
-    extractor: EventExtractor = Depends(get_extractor),
-    gate: ConsistencyGate = Depends(get_gate),
-):
+async def _process_draft(
+    story_id: str,
+    user_message: str,
+    assistant_draft: str,
+    repo: Repository,
+    extractor: EventExtractor,
+    gate: ConsistencyGate,
+) -> DraftProcessResponse:
     """
-    处理草稿：提取事件、校验一致性、应用更新
+    处理单条草稿的核心流程（/draft/process 与 /draft/process_batch 共用）
     
     流程：
     1. load state
@@ -166,185 +175,202 @@ async def process_draft(
     3. call extractor -> events
     4. run consistency gate on (state, draft, events)
     5. 根据 action 处理
-    
-    Args:
-        request: 草稿处理请求
-        
-    Returns:
-        DraftProcessResponse: 处理结果
     """
-    try:
-        # 1. Load state
-        state = await repo.get_state(request.story_id)
-        if state is None:
-            state = await repo.initialize_state(request.story_id)
-        
-        # 当前轮次应该是 state.meta.turn + 1（新的一轮）
-        current_turn = state.meta.turn + 1
+    # 1. Load state
+    state = await repo.get_state(story_id)
+    if state is None:
+        state = await repo.initialize_state(story_id)
+    
+    # 当前轮次应该是 state.meta.turn + 1（新的一轮）
+    current_turn = state.meta.turn + 1
+    
+    # 2. （可选）rag query - 由外部调用控制，本端点不强制
+    
+    # 3. Call extractor -> events
+    extraction_result = await extractor.extract_events(
+        canonical_state=state,
+        user_message=user_message,
+        assistant_draft=assistant_draft,
+        turn=current_turn,
+    )
+    
+    # 如果提取器要求用户输入，直接返回
+    if extraction_result.requires_user_input:
+        return DraftProcessResponse(
+            final_action="ASK_USER",
+            questions=extraction_result.open_questions,
+        )
+    
+    events = extraction_result.events
+    
+    # 4. Run consistency gate on (state, draft, events)
+    validation_result = gate.validate_event_patch(
+        current_state=state,
+        pending_events=events,
+    )
+    
+    # 5. 根据 action 处理
+    if validation_result.action == "PASS":
+        # PASS: append events + apply patches -> save state
+        # 应用所有事件的 state_patch
+        updated_state = apply_multiple_patches(state, events)
         
-        # 2. （可选）rag query - 由外部调用控制，本端点不强制
+        # 保存事件（单事务批量插入）
+        await repo.append_events(story_id, events)
         
-        # 3. Call extractor -> events
-        extraction_result = await extractor.extract_events(
-            canonical_state=state,
-            user_message=request.user_message,
-            assistant_draft=request.assistant_draft,
-            turn=current_turn,
-        )
+        # 保存状态
+        await repo.save_state(story_id, updated_state)
         
-        # 如果提取器要求用户输入，直接返回
-        if extraction_result.requires_user_input:
-            return DraftProcessResponse(
-                final_action="ASK_USER",
-                questions=extraction_result.open_questions,
-            )
+        # 获取最近事件
+        recent_events = await repo.list_recent_events(story_id, limit=10)
         
-        events = extraction_result.events
+        # 确保所有引用的location都存在（修复引用完整性）
+        _ensure_location_references(updated_state)
         
-        # 4. Run consistency gate on (state, draft, events)
-        validation_result = gate.validate_event_patch(
-            current_state=state,
-            pending_events=events,
+        return DraftProcessResponse(
+            final_action="PASS",
+            state=updated_state,
+            recent_events=recent_events,
         )
-        
-        # 5. 根据 action 处理
-        if validation_result.action == "PASS":
-            # PASS: append events + apply patches -> save state
-            # 应用所有事件的 state_patch
+    
+    elif validation_result.action == "AUTO_FIX":
+        # AUTO_FIX: apply fixes -> save
+        if validation_result.fixes:
+            # 应用修复补丁
+            # 先应用原始 events 的 patch
             updated_state = apply_multiple_patches(state, events)
             
-            # 保存事件
-            for event in events:
-                await repo.append_event(request.story_id, event)
+            # 然后应用 fixes（创建一个修复事件来应用 fixes）
+            # 注意：fixes 是一个 StatePatch，我们需要将其应用到状态
+            from ..core.state_manager import apply_state_patch
+            from ..models import Event, EventTime, EventLocation, EventParticipants, EventEvidence
+            import uuid
+            from datetime import datetime
+            
+            # 创建修复事件（用于应用 fixes）
+            fix_event_id = f"evt_fix_{current_turn}_{int(datetime.now().timestamp())}_{str(uuid.uuid4())[:8]}"
+            fix_event = Event(
+                event_id=fix_event_id,
+                turn=current_turn,
+                time=EventTime(
+                    label=updated_state.time.calendar,
+                    order=updated_state.time.anchor.order,
+                ),
+                where=EventLocation(location_id=updated_state.player.location_id),
+                who=EventParticipants(actors=[updated_state.player.id]),
+                type="OTHER",
+                summary="自动修复",
+                payload={"fix_type": "auto_fix"},
+                state_patch=validation_result.fixes,
+                evidence=EventEvidence(
+                    source=f"auto_fix_turn_{current_turn}",
+                    text_span=None,
+                ),
+            )
+            
+            # 应用修复补丁
+            updated_state = apply_state_patch(
+                updated_state,
+                validation_result.fixes,
+                fix_event_id,
+                current_turn,
+            )
+            
+            # 保存原始事件（单事务批量插入）
+            await repo.append_events(story_id, events)
+            
+            # 保存修复事件
+            await repo.append_event(story_id, fix_event)
             
             # 保存状态
-            await repo.save_state(request.story_id, updated_state)
+            await repo.save_state(story_id, updated_state)
             
             # 获取最近事件
-            recent_events = await repo.list_recent_events(request.story_id, limit=10)
+            recent_events = await repo.list_recent_events(story_id, limit=10)
             
             # 确保所有引用的location都存在（修复引用完整性）
             _ensure_location_references(updated_state)
             
             return DraftProcessResponse(
-                final_action="PASS",
+                final_action="AUTO_FIX",
                 state=updated_state,
                 recent_events=recent_events,
-            )
-        
-        elif validation_result.action == "AUTO_FIX":
-            # AUTO_FIX: apply fixes -> save
-            if validation_result.fixes:
-                # 应用修复补丁
-                # 先应用原始 events 的 patch
-                updated_state = apply_multiple_patches(state, events)
-                
-                # 然后应用 fixes（创建一个修复事件来应用 fixes）
-                # 注意：fixes 是一个 StatePatch，我们需要将其应用到状态
-                from ..core.state_manager import apply_state_patch
-                from ..models import Event, EventTime, EventLocation, EventParticipants, EventEvidence
-                import uuid
-                from datetime import datetime
-                
-                # 创建修复事件（用于应用 fixes）
-                fix_event_id = f"evt_fix_{current_turn}_{int(datetime.now().timestamp())}_{str(uuid.uuid4())[:8]}"
-                fix_event = Event(
-                    event_id=fix_event_id,
-                    turn=current_turn,
-                    time=EventTime(
-                        label=updated_state.time.calendar,
-                        order=updated_state.time.anchor.order,
-                    ),
-                    where=EventLocation(location_id=updated_state.player.location_id),
-                    who=EventParticipants(actors=[updated_state.player.id]),
-                    type="OTHER",
-                    summary="自动修复",
-                    payload={"fix_type": "auto_fix"},
-                    state_patch=validation_result.fixes,
-                    evidence=EventEvidence(
-                        source=f"auto_fix_turn_{current_turn}",
-                        text_span=None,
-                    ),
-                )
-                
-                # 应用修复补丁
-                updated_state = apply_state_patch(
-                    updated_state,
-                    validation_result.fixes,
-                    fix_event_id,
-                    current_turn,
-                )
-                
-                # 保存原始事件
-                for event in events:
-                    await repo.append_event(request.story_id, event)
-                
-                # 保存修复事件
-                await repo.append_event(request.story_id, fix_event)
-                
-                # 保存状态
-                await repo.save_state(request.story_id, updated_state)
-                
-                # 获取最近事件
-                recent_events = await repo.list_recent_events(request.story_id, limit=10)
-                
-                # 确保所有引用的location都存在（修复引用完整性）
-                _ensure_location_references(updated_state)
-                
-                return DraftProcessResponse(
-                    final_action="AUTO_FIX",
-                    state=updated_state,
-                    recent_events=recent_events,
-                    violations=[v.model_dump() for v in validation_result.violations],
-                )
-            else:
-                # 如果没有 fixes，当作 PASS 处理
-                updated_state = apply_multiple_patches(state, events)
-                for event in events:
-                    await repo.append_event(request.story_id, event)
-                await repo.save_state(request.story_id, updated_state)
-                recent_events = await repo.list_recent_events(request.story_id, limit=10)
-                
-                # 确保所有引用的location都存在（修复引用完整性）
-                _ensure_location_references(updated_state)
-                
-                return DraftProcessResponse(
-                    final_action="PASS",
-                    state=updated_state,
-                    recent_events=recent_events,
-                )
-        
-        elif validation_result.action == "REWRITE":
-            # REWRITE: 返回重写指令
-            rewrite_instructions = "\n".join(validation_result.reasons)
-            
-            return DraftProcessResponse(
-                final_action="REWRITE",
-                rewrite_instructions=rewrite_instructions,
                 violations=[v.model_dump() for v in validation_result.violations],
             )
-        
-        elif validation_result.action == "ASK_USER":
-            # ASK_USER: 返回问题
-            questions = validation_result.questions or [
-                f"规则 {v.rule_id} 违反: {v.message}"
-                for v in validation_result.violations
-            ]
+        else:
+            # 如果没有 fixes，当作 PASS 处理
+            updated_state = apply_multiple_patches(state, events)
+            await repo.append_events(story_id, events)
+            await repo.save_state(story_id, updated_state)
+            recent_events = await repo.list_recent_events(story_id, limit=10)
+            
+            # 确保所有引用的location都存在（修复引用完整性）
+            _ensure_location_references(updated_state)
             
             return DraftProcessResponse(
-                final_action="ASK_USER",
-                questions=questions,
-                violations=[v.model_dump() for v in validation_result.violations],
+                final_action="PASS",
+                state=updated_state,
+                recent_events=recent_events,
             )
+    
+    elif validation_result.action == "REWRITE":
+        # REWRITE: 返回重写指令
+        rewrite_instructions = "\n".join(validation_result.reasons)
         
-        else:
-            # 未知 action，当作 REWRITE 处理
-            return DraftProcessResponse(
-                final_action="REWRITE",
-                rewrite_instructions="未知的处理动作",
-                violations=[v.model_dump() for v in validation_result.violations],
-            )
+        return DraftProcessResponse(
+            final_action="REWRITE",
+            rewrite_instructions=rewrite_instructions,
+            violations=[v.model_dump() for v in validation_result.violations],
+        )
+    
+    elif validation_result.action == "ASK_USER":
+        # ASK_USER: 返回问题
+        questions = validation_result.questions or [
+            f"规则 {v.rule_id} 违反: {v.message}"
+            for v in validation_result.violations
+        ]
+        
+        return DraftProcessResponse(
+            final_action="ASK_USER",
+            questions=questions,
+            violations=[v.model_dump() for v in validation_result.violations],
+        )
+    
+    else:
+        # 未知 action，当作 REWRITE 处理
+        return DraftProcessResponse(
+            final_action="REWRITE",
+            rewrite_instructions="未知的处理动作",
+            violations=[v.model_dump() for v in validation_result.violations],
+        )
+    
+
+
+@app.post("/draft/process", response_model=DraftProcessResponse)
+async def process_draft(
+    request: DraftProcessRequest,
+    repo: Repository = Depends(get_repository),
+    extractor: EventExtractor = Depends(get_extractor),
+    gate: ConsistencyGate = Depends(get_gate),
+):
+    """
+    处理草稿：提取事件、校验一致性、应用更新
     
+    Args:
+        request: 草稿处理请求
+        
+    Returns:
+        DraftProcessResponse: 处理结果
+    """
+    try:
+        return await _process_draft(
+            story_id=request.story_id,
+            user_message=request.user_message,
+            assistant_draft=request.assistant_draft,
+            repo=repo,
+            extractor=extractor,
+            gate=gate,
+        )
     except Exception as e:
         # 错误处理
         raise HTTPException(
@@ -353,6 +379,50 @@ async def process_draft(
         )
 
 
+@app.post("/draft/process_batch", response_model=DraftBatchResponse)
+async def process_draft_batch(
+    request: DraftBatchRequest,
+    repo: Repository = Depends(get_repository),
+    extractor: EventExtractor = Depends(get_extractor),
+    gate: ConsistencyGate = Depends(get_gate),
+):
+    """
+    批量处理草稿：一次 HTTP 往返按顺序处理多条草稿
+    
+    各条草稿按提交顺序依次处理，后一条在前一条落盘后的状态上继续，
+    语义与逐条调用 /draft/process 相同，只是省去客户端多次往返。
+    
+    某条草稿抛异常时停止处理后续草稿，但不丢弃已完成的结果：
+    之前的草稿已经落盘，返回 200 并在 failed_index/error 中标出
+    失败位置，客户端据此从断点重试，避免重放已生效的草稿。
+    
+    Args:
+        request: 批量草稿处理请求
+        
+    Returns:
+        DraftBatchResponse: 与请求顺序一致的处理结果列表
+    """
+    results = []
+    for index, draft in enumerate(request.drafts):
+        try:
+            results.append(await _process_draft(
+                story_id=request.story_id,
+                user_message=draft.user_message,
+                assistant_draft=draft.assistant_draft,
+                repo=repo,
+                extractor=extractor,
+                gate=gate,
+            ))
+        except Exception as e:
+            # 逐条捕获：前面的结果已落盘，不能随 500 一起丢掉
+            return DraftBatchResponse(
+                results=results,
+                failed_index=index,
+                error=f"处理第 {index + 1} 条草稿时发生错误: {str(e)}",
+            )
+    return DraftBatchResponse(results=results)
+
+
 @app.get("/")
 async def root():
     """根端点 - 返回测试页面"""
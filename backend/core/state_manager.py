@@ -3,7 +3,6 @@ State Manager: 状态管理核心逻辑
 包含 apply_state_patch 等状态操作函数
 """
 import copy
-from datetime import datetime
 from typing import List, Set
 
 from ..models import (
@@ -18,6 +17,7 @@ from ..models import (
     Faction,
     Quest,
 )
+from ..models.state import _now_ms
 
 
 def _ensure_location_references(state: CanonicalState) -> None:
@@ -62,11 +62,32 @@ def _ensure_location_references(state: CanonicalState) -> None:
             )
 
 
+def _invalidate_cached_views(state: CanonicalState) -> None:
+    """清除状态对象上的 cached_property 缓存
+
+    原地修改状态后，dead_character_ids / alive_characters 等惰性视图
+    可能已经失效；逐个从 __dict__ 弹出，下次访问时重新构建。
+    """
+    state.__dict__.pop("dead_character_ids", None)
+    for key in ("character_views", "alive_characters"):
+        state.entities.__dict__.pop(key, None)
+    for key in (
+        "by_entity",
+        "by_type",
+        "unique_item_id_set",
+        "immutable_event_id_set",
+        "is_alternate_mode",
+    ):
+        state.constraints.__dict__.pop(key, None)
+
+
 def apply_state_patch(
     state: CanonicalState,
     patch: StatePatch,
     event_id: str,
     turn: int,
+    *,
+    in_place: bool = False,
 ) -> CanonicalState:
     """
     应用状态补丁到 Canonical State
@@ -76,12 +97,14 @@ def apply_state_patch(
         patch: 状态补丁
         event_id: 事件ID（用于记录）
         turn: 当前轮次
+        in_place: 为 True 时跳过深拷贝，直接修改传入的 state
+            （调用方确认不再需要旧状态时的快速路径）
         
     Returns:
         更新后的 Canonical State
     """
-    # 深度复制状态
-    new_state = copy.deepcopy(state)
+    # 深度复制状态（in_place 快速路径直接改原对象）
+    new_state = state if in_place else copy.deepcopy(state)
     
     # 应用 entity_updates
     for entity_id, entity_update in patch.entity_updates.items():
@@ -258,17 +281,26 @@ def apply_state_patch(
     # 更新 meta 信息
     new_state.meta.turn = turn
     new_state.meta.last_event_id = event_id
-    new_state.meta.updated_at = datetime.now()
+    # 严格递增：毫秒内连续打补丁时也保证 updated_at 变化，
+    # 依赖它做缓存版本号的消费方（gate/extractor）才能感知每次变更
+    new_state.meta.updated_at = max(_now_ms(), new_state.meta.updated_at + 1)
     
     # 确保所有引用的location都存在（修复引用完整性）
     _ensure_location_references(new_state)
-    
+
+    # 惰性视图缓存必须失效：原地修改不换新对象，而 deepcopy 也会把
+    # __dict__ 里已计算的 cached_property 值一并拷走，两条路径都可能
+    # 携带补丁前的过期视图
+    _invalidate_cached_views(new_state)
+
     return new_state
 
 
 def apply_multiple_patches(
     state: CanonicalState,
     events: List,
+    *,
+    in_place: bool = False,
 ) -> CanonicalState:
     """
     应用多个事件的 state_patch
@@ -276,6 +308,8 @@ def apply_multiple_patches(
     Args:
         state: 当前 Canonical State
         events: 事件列表（必须有序）
+        in_place: 为 True 时整条链路不做深拷贝，直接修改传入的 state；
+            每个事件省一次全状态深拷贝，代价是旧状态被覆盖
         
     Returns:
         更新后的 Canonical State
@@ -295,12 +329,13 @@ def apply_multiple_patches(
             event.state_patch,
             event.event_id,
             event.turn,
+            in_place=in_place,
         )
     
     # 确保最终状态记录正确的 turn 和 last_event_id
     current_state.meta.turn = max_turn
     current_state.meta.last_event_id = last_event_id
-    current_state.meta.updated_at = datetime.now()
+    current_state.meta.updated_at = max(_now_ms(), current_state.meta.updated_at + 1)
     
     # 确保所有引用的location都存在（修复引用完整性）
     _ensure_location_references(current_state)
@@ -60,10 +60,17 @@ async def init_database(db_path: Optional[Path] = None) -> None:
         """)
         
         await db.execute("""
-            CREATE INDEX IF NOT EXISTS idx_events_story_id 
+            CREATE INDEX IF NOT EXISTS idx_events_story_id
             ON events(story_id)
         """)
-        
+
+        # 与 list_recent_events 的 ORDER BY 完全同序的复合索引：
+        # 查询退化为索引范围扫描 + LIMIT，无需临时 B-tree 排序
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_events_recent
+            ON events(story_id, time_order DESC, turn DESC, created_at DESC)
+        """)
+
         await db.commit()
         print(f"✅ Database initialized at {db_path}")
 
@@ -88,5 +95,12 @@ async def get_db_connection(db_path: Optional[Path] = None):
     async with aiosqlite.connect(str(db_path)) as db:
         # 启用外键约束
         await db.execute("PRAGMA foreign_keys = ON")
+        # WAL + NORMAL：提交不再逐次 fsync 主库文件（fsync 推迟到 checkpoint），
+        # 读写也不互相阻塞；journal_mode 持久化在库文件里，重复设置是空操作。
+        # 其余为连接级调优：临时表驻内存、64MB 页缓存
+        await db.execute("PRAGMA journal_mode = WAL")
+        await db.execute("PRAGMA synchronous = NORMAL")
+        await db.execute("PRAGMA temp_store = MEMORY")
+        await db.execute("PRAGMA cache_size = -64000")
         yield db
 
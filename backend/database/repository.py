@@ -3,11 +3,11 @@ Repository 类：统一的数据访问接口
 提供 state 和 events 的 CRUD 操作
 """
 import json
-from datetime import datetime
 from typing import Optional, List, Dict, Any, Set
 from pathlib import Path
 
-from ..models import CanonicalState, Event, MetaInfo, TimeState, TimeAnchor, PlayerState, Entities, QuestState, Constraints, Location
+from ..models import CanonicalState, Event, MetaInfo, TimeState, TimeAnchor, PlayerState, Entities, QuestState, Constraints, Location, validate_canonical
+from ..models.state import _now_ms
 from .connection import get_db_connection, init_database
 from ..core.state_manager import _ensure_location_references
 
@@ -80,12 +80,14 @@ class Repository:
         """
         self.db_path = db_path
     
-    async def get_state(self, story_id: str) -> Optional[CanonicalState]:
+    async def get_state(self, story_id: str, trusted: bool = False) -> Optional[CanonicalState]:
         """
         获取指定 story_id 的状态
         
         Args:
             story_id: 剧本ID
+            trusted: 只读场景可置 True，用 load_trusted 跳过校验器
+                （写入时已完整校验过；写路径应保持默认的完整校验）
             
         Returns:
             CanonicalState 对象，如果不存在则返回 None
@@ -114,8 +116,13 @@ class Repository:
                 # 在验证之前修复缺失的location（避免Pydantic验证失败）
                 state_json = _fix_missing_locations_in_json(state_json)
                 
+                if trusted:
+                    # 只读路径：跳过校验器直接构建（数据写入时已校验）
+                    return CanonicalState.load_trusted(state_json)
+
                 try:
-                    state = CanonicalState.model_validate(state_json)
+                    # 预构建的 TypeAdapter，避免重复 schema 解析
+                    state = validate_canonical(state_json)
                 except Exception as e:
                     # Pydantic 验证失败，state 结构可能损坏
                     raise ValueError(
@@ -138,10 +145,12 @@ class Repository:
             _ensure_location_references(state)
             
             # 更新 state 的 meta 信息
-            state.meta.updated_at = datetime.now()
+            state.meta.updated_at = _now_ms()
             
-            state_json = state.model_dump_json()
-            updated_at = state.meta.updated_at.isoformat()
+            # orjson 编码直接得到 bytes，aiosqlite 按 BLOB 存储；
+            # 读路径的 json.loads 对 str/bytes 都能解析
+            state_json = state.to_json_bytes()
+            updated_at = state.meta.updated_at_dt.isoformat()
             
             # 使用 INSERT OR REPLACE 确保事务安全
             await db.execute(
@@ -194,6 +203,54 @@ class Repository:
             )
             await db.commit()
     
+    async def append_events(self, story_id: str, events: List[Event]) -> None:
+        """
+        批量追加事件（单事务 + executemany）
+        
+        与逐条 append_event 语义一致，但唯一性检查合并为一次查询、
+        全部插入共用一次 commit，fsync 次数从每事件一次降为一次。
+        
+        Args:
+            story_id: 剧本ID
+            events: Event 对象列表（按列表顺序插入）
+            
+        Raises:
+            ValueError: 如果任一 event_id 已存在
+        """
+        if not events:
+            return
+        
+        async with get_db_connection(self.db_path) as db:
+            # 一次查询检查所有 event_id 的唯一性
+            placeholders = ",".join("?" * len(events))
+            async with db.execute(
+                f"SELECT event_id FROM events WHERE event_id IN ({placeholders})",
+                [event.event_id for event in events]
+            ) as cursor:
+                existing = await cursor.fetchall()
+                if existing:
+                    duplicated = ", ".join(row[0] for row in existing)
+                    raise ValueError(f"Event with event_id '{duplicated}' already exists")
+            
+            await db.executemany(
+                """
+                INSERT INTO events (story_id, event_id, turn, time_order, event_json, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        story_id,
+                        event.event_id,
+                        event.turn,
+                        event.time.order,
+                        event.model_dump_json(),
+                        event.created_at.isoformat()
+                    )
+                    for event in events
+                ]
+            )
+            await db.commit()
+    
     async def list_recent_events(
         self, 
         story_id: str, 
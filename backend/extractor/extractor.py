@@ -2,6 +2,7 @@
 Event Extractor: 从对话草稿中提取结构化事件
 """
 import json
+import re
 import uuid
 from datetime import datetime
 from typing import List, Optional, Dict, Any
@@ -37,6 +38,7 @@ class EventExtractor:
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         model: Optional[str] = None,
+        http_client: Optional[Any] = None,
     ):
         """
         初始化 Event Extractor
@@ -45,6 +47,8 @@ class EventExtractor:
             api_key: OpenAI API Key，如果为 None 则从 settings 读取
             base_url: OpenAI API Base URL，如果为 None 则从 settings 读取
             model: 使用的模型，如果为 None 则从 settings 读取
+            http_client: 自定义 httpx.AsyncClient（如换用 aiohttp 传输层），
+                如果为 None 则使用 SDK 默认客户端
         """
         self.api_key = api_key or settings.super_mind_api_key
         self.base_url = base_url or settings.openai_base_url
@@ -56,7 +60,16 @@ class EventExtractor:
         self.client = AsyncOpenAI(
             api_key=self.api_key,
             base_url=self.base_url,
+            http_client=http_client,
         )
+
+        # 状态摘要缓存：同一状态对象连续抽取时只格式化一次
+        self._state_summary_cache: Optional[tuple] = None
+        # 系统提示词缓存（按状态对象 + 轮次），重试/重复调用直接复用
+        self._system_prompt_cache: Optional[tuple] = None
+        # function calling 定义与 JSON Schema 与状态无关，懒构建一次
+        self._function_def_cache: Optional[Dict[str, Any]] = None
+        self._json_schema_cache: Optional[Dict[str, Any]] = None
     
     async def extract_events(
         self,
@@ -77,8 +90,8 @@ class EventExtractor:
         Returns:
             ExtractionResult: 提取结果
         """
-        # 生成系统提示词
-        system_prompt = self._build_system_prompt(canonical_state, turn)
+        # 生成系统提示词（同一状态对象同一轮次时命中缓存）
+        system_prompt = self._get_system_prompt(canonical_state, turn)
         
         # 生成用户提示词
         user_prompt = self._build_user_prompt(user_message, assistant_draft)
@@ -147,12 +160,112 @@ class EventExtractor:
             requires_user_input=requires_user_input,
         )
     
+    async def extract_events_stream(
+        self,
+        canonical_state: CanonicalState,
+        user_message: str,
+        assistant_draft: str,
+        turn: int,
+    ):
+        """
+        流式提取事件：边接收 LLM 输出边产出已验证的 Event
+        
+        使用 JSON 模式 + stream=True，events 数组中每个对象一旦完整到达
+        就立即校验并 yield，首事件延迟从整个响应的时长降到首个对象的时长。
+        
+        注意：流式路径只走 JSON 模式（不做 function calling 回退），
+        open_questions 不在此路径返回；需要完整结果时仍用 extract_events。
+        
+        Args:
+            canonical_state: 当前 Canonical State
+            user_message: 用户消息
+            assistant_draft: 助手生成的草稿
+            turn: 当前轮次
+            
+        Yields:
+            Event: 已完成校验和转换的事件
+        """
+        system_prompt = self._get_system_prompt(canonical_state, turn)
+        user_prompt = self._build_user_prompt(user_message, assistant_draft)
+        
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.2,
+            stream=True,
+        )
+        
+        buffer = ""
+        scan_pos: Optional[int] = None  # events 数组内的扫描位置；None 表示还没找到数组
+        decoder = json.JSONDecoder()
+        
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            buffer += delta
+            
+            # 定位 "events" 数组的起始位置（只找一次）
+            if scan_pos is None:
+                match = re.search(r'"events"\s*:\s*\[', buffer)
+                if match is None:
+                    continue
+                scan_pos = match.end()
+            
+            # 从扫描位置开始，解析所有已完整到达的事件对象
+            while True:
+                while scan_pos < len(buffer) and buffer[scan_pos] in ' \t\r\n,':
+                    scan_pos += 1
+                if scan_pos >= len(buffer) or buffer[scan_pos] != '{':
+                    break
+                try:
+                    event_data, consumed = decoder.raw_decode(buffer[scan_pos:])
+                except json.JSONDecodeError:
+                    break  # 对象尚未完整，等下一个 chunk
+                scan_pos += consumed
+                
+                try:
+                    extracted_event = ExtractedEvent.model_validate(event_data)
+                    yield self._convert_to_event(extracted_event, turn, assistant_draft)
+                except Exception as e:
+                    print(f"Warning: Failed to parse streamed event: {e}")
+    
+    def _get_system_prompt(self, state: CanonicalState, turn: int) -> str:
+        """系统提示词缓存（按状态对象 + 轮次）
+
+        重试或对同一状态重复抽取时跳过整段模板的重新渲染
+        """
+        cached = self._system_prompt_cache
+        if (
+            cached is not None
+            and cached[0] is state
+            and cached[1] == state.meta.updated_at
+            and cached[2] == turn
+        ):
+            return cached[3]
+
+        prompt = self._build_system_prompt(state, turn)
+        self._system_prompt_cache = (state, state.meta.updated_at, turn, prompt)
+        return prompt
+
     def _build_system_prompt(self, state: CanonicalState, turn: int) -> str:
-        """构建系统提示词"""
+        """构建系统提示词
+
+        不变的指令正文放最前、随轮次变化的状态快照放最后：这样多轮
+        调用间提示词共享一段字节级一致的前缀，支持前缀缓存的推理
+        后端（如 vLLM）可以跳过这部分的重复 prefill。
+        """
         # 格式化当前状态摘要
         state_summary = self._format_state_summary(state)
         
         # 获取当前玩家位置和关键实体ID，用于示例
+        # （由状态内容决定，状态不变时示例字节级一致）
         player_location = state.player.location_id
         player_id = state.player.id
         example_char_id = list(state.entities.characters.keys())[0] if state.entities.characters else "caocao"
@@ -160,10 +273,6 @@ class EventExtractor:
         
         prompt = f"""你是一个事件提取器，负责从对话草稿中提取结构化事件并识别所有状态变化。
 
-## 当前状态（Turn {turn}）
-
-{state_summary}
-
 ## 核心任务
 
 **你必须识别草稿中的所有状态变化，并在 state_patch 中准确记录！**
@@ -306,7 +415,7 @@ class EventExtractor:
 {{
   "events": [
     {{
-      "turn": {turn},
+      "turn": 1,
       "time": {{"label": "{state.time.calendar}", "order": {state.time.anchor.order + 1}}},
       "where": {{"location_id": "{player_location}"}},
       "who": {{"actors": ["{player_id}", "{example_char_id}"], "witnesses": []}},
@@ -335,7 +444,7 @@ class EventExtractor:
         "quest_updates": null,
         "constraint_additions": []
       }},
-      "evidence": {{"source": "draft_turn_{turn}", "text_span": null}},
+      "evidence": {{"source": "draft_turn_1", "text_span": null}},
       "confidence": 1.0
     }}
   ],
@@ -351,7 +460,7 @@ class EventExtractor:
 {{
   "events": [
     {{
-      "turn": {turn},
+      "turn": 1,
       "time": {{"label": "{state.time.calendar}", "order": {state.time.anchor.order + 1}}},
       "where": {{"location_id": "xuchang"}},
       "who": {{"actors": ["{player_id}"], "witnesses": []}},
@@ -379,7 +488,7 @@ class EventExtractor:
         "quest_updates": null,
         "constraint_additions": []
       }},
-      "evidence": {{"source": "draft_turn_{turn}", "text_span": null}},
+      "evidence": {{"source": "draft_turn_1", "text_span": null}},
       "confidence": 1.0
     }}
   ],
@@ -414,11 +523,37 @@ class EventExtractor:
 **重要**：你必须调用 extract_events 函数来返回结果，不要输出任何其他内容！
 
 函数会自动验证格式，如果格式错误会导致提取失败。
+
+## 当前状态（Turn {turn}）
+
+{state_summary}
+
+**注意**：上文示例里的 turn 数值仅为格式演示，实际提取时每个事件的
+turn 必须填当前轮次 {turn}。
 """
         return prompt
     
     def _format_state_summary(self, state: CanonicalState) -> str:
-        """格式化状态摘要"""
+        """格式化状态摘要（按状态对象 + 版本缓存）
+
+        同一 CanonicalState 多次抽取时摘要只构建一次；meta.updated_at
+        作版本号，原地打补丁后缓存自动失效。稳定的提示词前缀
+        也让 LLM 侧的 prompt 前缀缓存有机会命中
+        """
+        cached = self._state_summary_cache
+        if (
+            cached is not None
+            and cached[0] is state
+            and cached[1] == state.meta.updated_at
+        ):
+            return cached[2]
+
+        summary = self._build_state_summary(state)
+        self._state_summary_cache = (state, state.meta.updated_at, summary)
+        return summary
+
+    def _build_state_summary(self, state: CanonicalState) -> str:
+        """实际构建状态摘要文本"""
         lines = []
         
         # 时间信息
@@ -489,12 +624,14 @@ class EventExtractor:
 """
     
     def _get_function_definition(self) -> Dict[str, Any]:
-        """获取 Function Calling 的函数定义"""
+        """获取 Function Calling 的函数定义（内容固定，懒构建一次）"""
+        if self._function_def_cache is not None:
+            return self._function_def_cache
         # 获取 ExtractedEvent 的 JSON Schema
         extracted_event_schema = ExtractedEvent.model_json_schema()
         
         # 定义 function calling 的工具
-        return {
+        self._function_def_cache = {
             "type": "function",
             "function": {
                 "name": "extract_events",
@@ -521,9 +658,12 @@ class EventExtractor:
                 }
             }
         }
+        return self._function_def_cache
     
     def _get_json_schema(self) -> Dict[str, Any]:
-        """获取 JSON Schema（用于回退模式）"""
+        """获取 JSON Schema（用于回退模式，内容固定，懒构建一次）"""
+        if self._json_schema_cache is not None:
+            return self._json_schema_cache
         # 使用 ExtractedEvent 的 JSON Schema
         # 但需要包装成包含 events 数组和 open_questions 的格式
         
@@ -531,7 +671,7 @@ class EventExtractor:
         extracted_event_schema = ExtractedEvent.model_json_schema()
         
         # OpenAI 的 JSON schema 格式需要特定的结构
-        return {
+        self._json_schema_cache = {
             "type": "object",
             "properties": {
                 "events": {
@@ -550,6 +690,7 @@ class EventExtractor:
             },
             "required": ["events"]
         }
+        return self._json_schema_cache
     
     async def _call_llm_with_function_calling(
         self,
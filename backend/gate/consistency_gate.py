@@ -2,20 +2,65 @@
 Consistency Gate: 一致性校验器
 实现 10 条规则校验，确保状态一致性
 """
+import re
+import sys
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import List, Optional, Literal, Dict, Set
 from pydantic import BaseModel, Field
 
 from ..models import (
     CanonicalState,
+    Entities,
     Event,
     ExtractedEvent,
     StatePatch,
     EntityUpdate,
     Item,
     Character,
+    TimeState,
 )
 
 
+# 规则名称常量：sys.intern 保证所有违反记录共享同一字符串对象，
+# 降低校验报告的内存占用并让比较退化为指针比较
+_R1_NAME = sys.intern("唯一物品不能多重归属")
+_R2_NAME = sys.intern("物品位置与归属一致")
+_R3_NAME = sys.intern("死亡角色不能行动/说话")
+_R4_NAME = sys.intern("生死/状态变更必须显式事件")
+_R5_NAME = sys.intern("位置变化必须由 move 事件解释（防瞬移）")
+_R6_NAME = sys.intern("同一角色同一时刻不能在多个地点")
+_R7_NAME = sys.intern("时间戳单调递增（回忆不推进time）")
+_R8_NAME = sys.intern("immutable timeline constraints 不可违背")
+_R9_NAME = sys.intern("阵营/关系变更需可追溯事件")
+_R10_NAME = sys.intern("草稿硬事实必须忠实于 canonical state")
+
+
+# 哨兵值：区分"字段未出现在 updates 中"与"字段值为 None"
+_MISSING = object()
+
+# 草稿校验用的关键词集合：模块加载时固定，避免每次调用重建列表
+_ACTION_KEYWORDS = frozenset({"说", "道", "做", "行动", "前往", "拿起", "放下", "使用"})
+_DEATH_KEYWORDS = frozenset({"死亡", "死了", "去世", "逝世", "被杀", "被斩"})
+_LOCATION_KEYWORDS = frozenset({"在", "位于", "到达", "来到", "到了"})
+
+# 预编译的关键词交替正则：一次 C 级线性扫描找出全部命中位置，
+# 代替逐关键词 × 逐角色的 str.find 子串扫描
+_ACTION_KEYWORD_RE = re.compile("|".join(map(re.escape, sorted(_ACTION_KEYWORDS))))
+_DEATH_KEYWORD_RE = re.compile("|".join(map(re.escape, sorted(_DEATH_KEYWORDS))))
+
+# 句子分割正则（按句号、问号、感叹号），模块加载时预编译
+_SENT_SPLIT_RE = re.compile(r'[。！？]')
+
+# 共享的空违反结果：规则提前返回时复用，避免每次分配新列表
+_EMPTY_VIOLATIONS: tuple = ()
+
+# 校验结果记忆缓存的容量上限（LRU 淘汰）
+_VALIDATION_CACHE_SIZE = 128
+
+
 # ==================== 数据模型 ====================
 class RuleViolation(BaseModel):
     """规则违反"""
@@ -27,6 +72,22 @@ class RuleViolation(BaseModel):
     fixable: bool = Field(default=False, description="是否可自动修复")
 
 
+@dataclass(slots=True, frozen=True)
+class _FastViolation:
+    """内部热路径用的轻量违反记录
+
+    规则检查会批量产生短生命周期的违反对象，slots 数据类省去
+    pydantic 校验与 __dict__ 开销；在 _determine_action 的 API
+    边界处统一转换为 RuleViolation
+    """
+    rule_id: str
+    rule_name: str
+    message: str
+    severity: str = "error"
+    entity_id: Optional[str] = None
+    fixable: bool = False
+
+
 class ValidationResult(BaseModel):
     """校验结果"""
     action: Literal["PASS", "AUTO_FIX", "REWRITE", "ASK_USER"] = Field(..., description="处理动作")
@@ -54,35 +115,129 @@ class ConsistencyGate:
             "R9": self._check_r9_traceable_relationship_change,
             "R10": self._check_r10_draft_factual_consistency,
         }
-    
+        # 规则线程池（惰性创建）：所有规则只读 current_state/temp_state，
+        # 互不共享可变数据，可安全并行执行
+        self._rule_executor: Optional[ThreadPoolExecutor] = None
+        # 校验结果记忆缓存：LLM 重试循环中同一 (state, events) 组合
+        # 会被反复校验；key -> (state, result)，命中时用 is 比对状态
+        # 对象身份，避免 id() 复用带来的误命中；key 里带 meta.updated_at
+        # 作为版本号，原地修改（对象身份不变）同样使旧条目失效
+        self._validation_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def _get_rule_executor(self) -> ThreadPoolExecutor:
+        """获取规则检查线程池（首次使用时创建）"""
+        if self._rule_executor is None:
+            self._rule_executor = ThreadPoolExecutor(
+                max_workers=len(self.rules),
+                thread_name_prefix="gate-rule",
+            )
+        return self._rule_executor
+
     def validate_event_patch(
         self,
         current_state: CanonicalState,
         pending_events: List[Event],
+        fail_fast: bool = False,
     ) -> ValidationResult:
         """
         校验待写入的事件补丁
-        
+
         Args:
             current_state: 当前 Canonical State
             pending_events: 待写入的事件列表
-            
+            fail_fast: 发现 error 级违反后立即停止后续规则检查
+                （结果必然是 REWRITE/ASK_USER，继续检查是浪费；
+                需要完整诊断列表时保持 False）
+
         Returns:
             ValidationResult: 校验结果
         """
         violations: List[RuleViolation] = []
-        
+
+        # 记忆缓存：规则是 (state, events) 的纯函数，event_id 内容寻址，
+        # 重试循环中相同输入直接复用上次结果
+        cache_key = (
+            id(current_state),
+            current_state.meta.updated_at,
+            tuple(event.event_id for event in pending_events),
+            fail_fast,
+        )
+        cached = self._validation_cache.get(cache_key)
+        if cached is not None and cached[0] is current_state:
+            self._validation_cache.move_to_end(cache_key)
+            return cached[1]
+
         # 应用所有 pending_events 的 state_patch，构建临时状态用于校验
         temp_state = self._apply_patches_to_state(current_state, pending_events)
-        
+
         # 执行所有规则检查
-        for rule_id, check_func in self.rules.items():
-            rule_violations = check_func(current_state, temp_state, pending_events)
-            violations.extend(rule_violations)
-        
+        if fail_fast:
+            # fail-fast 模式：串行执行，出现硬错误后跳过剩余规则
+            for rule_id, check_func in self.rules.items():
+                rule_violations = check_func(current_state, temp_state, pending_events)
+                violations.extend(rule_violations)
+                if any(v.severity == "error" for v in rule_violations):
+                    break
+        else:
+            # 规则之间无共享可变状态，并行执行并按提交顺序收集，
+            # 保证违反列表的顺序与串行执行一致
+            executor = self._get_rule_executor()
+            futures = [
+                executor.submit(check_func, current_state, temp_state, pending_events)
+                for check_func in self.rules.values()
+            ]
+            for future in futures:
+                violations.extend(future.result())
+
         # 根据违反情况决定 action
-        return self._determine_action(violations, current_state, temp_state)
+        result = self._determine_action(violations, current_state, temp_state)
+
+        # 写入记忆缓存并按 LRU 淘汰
+        self._validation_cache[cache_key] = (current_state, result)
+        if len(self._validation_cache) > _VALIDATION_CACHE_SIZE:
+            self._validation_cache.popitem(last=False)
+
+        return result
     
+    def validate_event_patch_batch(
+        self,
+        current_state: CanonicalState,
+        candidates: List[List[Event]],
+        fail_fast: bool = False,
+        early_exit: bool = False,
+    ) -> List[ValidationResult]:
+        """
+        批量校验多组候选事件补丁（如 LLM 重写产生的多个变体）
+
+        current_state 上缓存的索引（约束分桶、死亡角色集合等）在
+        第一组候选时构建，其余候选直接复用；每组候选只承担
+        O(补丁) 的临时状态构建成本。
+
+        Args:
+            current_state: 当前 Canonical State
+            candidates: 候选事件列表的列表，每项独立校验
+            fail_fast: 透传给单次校验（见 validate_event_patch）
+            early_exit: 只需要"第一组通过"语义时设为 True，
+                遇到 PASS 后跳过剩余候选（隐含 fail_fast）
+
+        Returns:
+            与已校验候选一一对应的 ValidationResult 列表
+            （early_exit 提前结束时可能短于 candidates）
+        """
+        results: List[ValidationResult] = []
+
+        for pending_events in candidates:
+            result = self.validate_event_patch(
+                current_state,
+                pending_events,
+                fail_fast=fail_fast or early_exit,
+            )
+            results.append(result)
+            if early_exit and result.action == "PASS":
+                break
+
+        return results
+
     def validate_draft(
         self,
         current_state: CanonicalState,
@@ -99,23 +254,31 @@ class ConsistencyGate:
             ValidationResult: 校验结果
         """
         violations: List[RuleViolation] = []
-        
+
         # 从草稿中提取可能的事实（简化版：检查关键词）
         # 这里先实现基础版本，后续可以增强
-        
+
+        # 单次扫描建立"角色名 -> 首次出现位置"索引，
+        # 代替每个角色一次 O(N) 的 str.find
+        name_index = self._first_occurrence_index(
+            draft_text,
+            [char.name for char in current_state.entities.characters.values()],
+        )
+
         # R3: 检查死亡角色是否在草稿中出现为行动者
         dead_characters = {
             char_id: char.name
             for char_id, char in current_state.entities.characters.items()
             if not char.alive
         }
-        
+
         for char_id, char_name in dead_characters.items():
             # 简单检查：如果死亡角色名称出现在动作相关词汇附近
-            if self._check_character_action_in_text(draft_text, char_name):
-                violations.append(RuleViolation(
+            char_index = name_index.get(char_name, -1)
+            if self._check_character_action_in_text(draft_text, char_name, char_index):
+                violations.append(_FastViolation(
                     rule_id="R3",
-                    rule_name="死亡角色不能行动/说话",
+                    rule_name=_R3_NAME,
                     severity="error",
                     message=f"死亡角色 '{char_name}' 在草稿中表现为行动或说话",
                     entity_id=char_id,
@@ -124,7 +287,7 @@ class ConsistencyGate:
         
         # R10: 检查草稿硬事实是否忠实于 canonical state
         # 在草稿检查中，需要从文本中提取硬事实
-        r10_violations = self._extract_and_check_hard_facts(draft_text, current_state)
+        r10_violations = self._extract_and_check_hard_facts(draft_text, current_state, name_index)
         violations.extend(r10_violations)
         
         # 根据违反情况决定 action
@@ -146,8 +309,8 @@ class ConsistencyGate:
         """
         violations: List[RuleViolation] = []
         
-        # 获取所有唯一物品ID
-        unique_item_ids = set(current_state.constraints.unique_item_ids)
+        # 获取所有唯一物品ID（使用约束容器上缓存的冻结集合）
+        unique_item_ids = current_state.constraints.unique_item_id_set
         
         # 检查当前状态中的唯一物品
         for item_id in unique_item_ids:
@@ -187,9 +350,9 @@ class ConsistencyGate:
                     item_name = current_state.entities.items[item_id].name
                 else:
                     item_name = item_id
-                violations.append(RuleViolation(
+                violations.append(_FastViolation(
                     rule_id="R1",
-                    rule_name="唯一物品不能多重归属",
+                    rule_name=_R1_NAME,
                     severity="error",
                     message=f"唯一物品 '{item_name}' ({item_id}) 在多个事件中被分配给不同的拥有者: {unique_new_owners}",
                     entity_id=item_id,
@@ -248,9 +411,9 @@ class ConsistencyGate:
                 # 检查 location_id 是否一致
                 if expected_location_id and item.location_id != expected_location_id:
                     item_name = item.name
-                    violations.append(RuleViolation(
+                    violations.append(_FastViolation(
                         rule_id="R2",
-                        rule_name="物品位置与归属一致",
+                        rule_name=_R2_NAME,
                         severity="warning",  # 可以自动修复
                         message=f"物品 '{item_name}' ({item_id}) 的 location_id ({item.location_id}) "
                                f"与 owner ({item.owner_id}) 的位置 ({expected_location_id}) 不一致",
@@ -278,23 +441,26 @@ class ConsistencyGate:
         2. state_patch 中是否有死亡角色被更新为 alive=True 但没有 DEATH/REVIVAL 事件
         """
         violations: List[RuleViolation] = []
-        
-        # 获取所有死亡角色ID
-        dead_character_ids = {
-            char_id
-            for char_id, char in current_state.entities.characters.items()
-            if not char.alive
-        }
-        
+        # 去重集合：同一角色跨多个事件重复触发时只报告一次
+        seen: Set[tuple] = set()
+
+        # 获取所有死亡角色ID（缓存在状态对象上，避免每条规则重建）
+        dead_character_ids = current_state.dead_character_ids
+
         # 检查 pending_events 中的参与者
         for event in pending_events:
             # 检查 actors
             for actor_id in event.who.actors:
                 if actor_id in dead_character_ids:
+                    key = ("R3", actor_id, "actor")
+                    before = len(seen)
+                    seen.add(key)
+                    if len(seen) == before:
+                        continue
                     char_name = current_state.entities.characters[actor_id].name
-                    violations.append(RuleViolation(
+                    violations.append(_FastViolation(
                         rule_id="R3",
-                        rule_name="死亡角色不能行动/说话",
+                        rule_name=_R3_NAME,
                         severity="error",
                         message=f"死亡角色 '{char_name}' ({actor_id}) 在事件 '{event.summary}' 中作为行动者",
                         entity_id=actor_id,
@@ -317,10 +483,15 @@ class ConsistencyGate:
                         if char_id in dead_character_ids:
                             # 检查是否被更新为 alive=True
                             if entity_update.updates.get("alive") is True:
+                                key = ("R3", char_id, "alive")
+                                before = len(seen)
+                                seen.add(key)
+                                if len(seen) == before:
+                                    continue
                                 char_name = current_state.entities.characters[char_id].name
-                                violations.append(RuleViolation(
+                                violations.append(_FastViolation(
                                     rule_id="R3",
-                                    rule_name="死亡角色不能行动/说话",
+                                    rule_name=_R3_NAME,
                                     severity="error",
                                     message=f"死亡角色 '{char_name}' ({char_id}) 被更新为 alive=True，但事件类型不是 REVIVAL",
                                     entity_id=char_id,
@@ -344,40 +515,52 @@ class ConsistencyGate:
         2. 其他重要状态变更（如 faction_id）应该有对应的事件类型
         """
         violations: List[RuleViolation] = []
-        
+        # 去重集合：同一角色同一字段的重复违反只报告一次
+        seen: Set[tuple] = set()
+        # 只读视图快照：热循环中的属性访问走 namedtuple 的 C 级路径
+        char_views = current_state.entities.character_views
+
         # 检查每个事件中的状态变更
         for event in pending_events:
             for entity_id, entity_update in event.state_patch.entity_updates.items():
                 if entity_update.entity_type == "character":
                     char_id = entity_update.entity_id
-                    
+                    # 只读取一次 updates，避免重复的属性/字典访问
+                    upd = entity_update.updates
+                    new_alive = upd.get("alive", _MISSING)
+                    new_faction = upd.get("faction_id", _MISSING)
+
                     # 检查 alive 状态变更
-                    if "alive" in entity_update.updates:
-                        new_alive = entity_update.updates["alive"]
-                        
+                    if new_alive is not _MISSING:
                         # 获取当前状态
-                        if char_id in current_state.entities.characters:
-                            current_char = current_state.entities.characters[char_id]
+                        current_char = char_views.get(char_id)
+                        if current_char is not None:
                             current_alive = current_char.alive
-                            
+
                             # 如果状态发生变化
                             if current_alive != new_alive:
                                 char_name = current_char.name
-                                
+                                key = ("R4", char_id, "alive")
+                                before = len(seen)
+                                seen.add(key)
+                                already_seen = len(seen) == before
+
                                 # 检查事件类型是否匹配
-                                if new_alive is False and event.type != "DEATH":
-                                    violations.append(RuleViolation(
+                                if already_seen:
+                                    pass
+                                elif new_alive is False and event.type != "DEATH":
+                                    violations.append(_FastViolation(
                                         rule_id="R4",
-                                        rule_name="生死/状态变更必须显式事件",
+                                        rule_name=_R4_NAME,
                                         severity="error",
                                         message=f"角色 '{char_name}' ({char_id}) 的 alive 状态从 True 变为 False，但事件类型不是 DEATH",
                                         entity_id=char_id,
                                         fixable=False,
                                     ))
                                 elif new_alive is True and event.type != "REVIVAL":
-                                    violations.append(RuleViolation(
+                                    violations.append(_FastViolation(
                                         rule_id="R4",
-                                        rule_name="生死/状态变更必须显式事件",
+                                        rule_name=_R4_NAME,
                                         severity="error",
                                         message=f"角色 '{char_name}' ({char_id}) 的 alive 状态从 False 变为 True，但事件类型不是 REVIVAL",
                                         entity_id=char_id,
@@ -385,17 +568,21 @@ class ConsistencyGate:
                                     ))
                     
                     # 检查 faction_id 变更（应该有 FACTION_CHANGE 事件）
-                    if "faction_id" in entity_update.updates:
-                        if char_id in current_state.entities.characters:
-                            current_char = current_state.entities.characters[char_id]
+                    if new_faction is not _MISSING:
+                        current_char = char_views.get(char_id)
+                        if current_char is not None:
                             current_faction = current_char.faction_id
-                            new_faction = entity_update.updates["faction_id"]
-                            
+
                             if current_faction != new_faction and event.type != "FACTION_CHANGE":
+                                key = ("R4", char_id, "faction_id")
+                                before = len(seen)
+                                seen.add(key)
+                                if len(seen) == before:
+                                    continue
                                 char_name = current_char.name
-                                violations.append(RuleViolation(
+                                violations.append(_FastViolation(
                                     rule_id="R4",
-                                    rule_name="生死/状态变更必须显式事件",
+                                    rule_name=_R4_NAME,
                                     severity="error",
                                     message=f"角色 '{char_name}' ({char_id}) 的 faction_id 从 '{current_faction}' 变为 '{new_faction}'，但事件类型不是 FACTION_CHANGE",
                                     entity_id=char_id,
@@ -419,17 +606,19 @@ class ConsistencyGate:
         2. 物品的 location_id 变更（如果 owner 是人物）应该跟随 owner 的位置
         """
         violations: List[RuleViolation] = []
-        
+        # 去重集合：同一角色的重复位置违反只报告一次
+        seen: Set[tuple] = set()
+
         # 检查每个事件中的位置变更
         for event in pending_events:
             for entity_id, entity_update in event.state_patch.entity_updates.items():
                 if entity_update.entity_type == "character":
                     char_id = entity_update.entity_id
-                    
+                    # 只读取一次 updates，避免重复的属性/字典访问
+                    new_location_id = entity_update.updates.get("location_id", _MISSING)
+
                     # 检查 location_id 变更
-                    if "location_id" in entity_update.updates:
-                        new_location_id = entity_update.updates["location_id"]
-                        
+                    if new_location_id is not _MISSING:
                         # 获取当前状态
                         if char_id in current_state.entities.characters:
                             current_char = current_state.entities.characters[char_id]
@@ -441,9 +630,14 @@ class ConsistencyGate:
                                 
                                 # 检查事件类型是否是 TRAVEL
                                 if event.type != "TRAVEL":
-                                    violations.append(RuleViolation(
+                                    key = ("R5", char_id, "location_id")
+                                    before = len(seen)
+                                    seen.add(key)
+                                    if len(seen) == before:
+                                        continue
+                                    violations.append(_FastViolation(
                                         rule_id="R5",
-                                        rule_name="位置变化必须由 move 事件解释（防瞬移）",
+                                        rule_name=_R5_NAME,
                                         severity="error",
                                         message=f"角色 '{char_name}' ({char_id}) 的位置从 '{current_location_id}' 变为 '{new_location_id}'，但事件类型不是 TRAVEL",
                                         entity_id=char_id,
@@ -453,9 +647,14 @@ class ConsistencyGate:
                                     # 验证 TRAVEL 事件的 payload 是否匹配
                                     if "character_id" in event.payload:
                                         if event.payload["character_id"] != char_id:
-                                            violations.append(RuleViolation(
+                                            key = ("R5", char_id, "payload")
+                                            before = len(seen)
+                                            seen.add(key)
+                                            if len(seen) == before:
+                                                continue
+                                            violations.append(_FastViolation(
                                                 rule_id="R5",
-                                                rule_name="位置变化必须由 move 事件解释（防瞬移）",
+                                                rule_name=_R5_NAME,
                                                 severity="error",
                                                 message=f"TRAVEL 事件的 character_id ({event.payload.get('character_id')}) 与更新的角色 ({char_id}) 不匹配",
                                                 entity_id=char_id,
@@ -465,7 +664,8 @@ class ConsistencyGate:
                 elif entity_update.entity_type == "item":
                     # 物品的位置变更通常跟随 owner，这里主要检查是否有不合理的独立位置变更
                     item_id = entity_update.entity_id
-                    if "location_id" in entity_update.updates and "owner_id" not in entity_update.updates:
+                    upd = entity_update.updates
+                    if "location_id" in upd and "owner_id" not in upd:
                         # 如果只更新 location_id 而不更新 owner_id，可能是问题
                         # 但这不是强制性的，因为物品可能被放在某个地点
                         pass  # 暂时不检查物品的独立位置变更
@@ -495,9 +695,9 @@ class ConsistencyGate:
             if char_id in character_locations:
                 # 这不应该发生，因为每个角色只有一个 location_id
                 char_name = char.name
-                violations.append(RuleViolation(
+                violations.append(_FastViolation(
                     rule_id="R6",
-                    rule_name="同一角色同一时刻不能在多个地点",
+                    rule_name=_R6_NAME,
                     severity="error",
                     message=f"角色 '{char_name}' ({char_id}) 在状态中有多个位置定义",
                     entity_id=char_id,
@@ -546,9 +746,9 @@ class ConsistencyGate:
                         char_name = current_state.entities.characters[char_id].name
                     else:
                         char_name = char_id
-                    violations.append(RuleViolation(
+                    violations.append(_FastViolation(
                         rule_id="R6",
-                        rule_name="同一角色同一时刻不能在多个地点",
+                        rule_name=_R6_NAME,
                         severity="error",
                         message=f"角色 '{char_name}' ({char_id}) 在时间点 {time_order} 同时出现在多个地点: {locations}",
                         entity_id=char_id,
@@ -587,9 +787,9 @@ class ConsistencyGate:
                 
                 # 时间应该 >= 当前时间
                 if event_time_order < current_time_order:
-                    violations.append(RuleViolation(
+                    violations.append(_FastViolation(
                         rule_id="R7",
-                        rule_name="时间戳单调递增（回忆不推进time）",
+                        rule_name=_R7_NAME,
                         severity="error",
                         message=f"事件 '{event.summary}' (event_id: {event.event_id}) 的时间顺序值 ({event_time_order}) 小于当前时间 ({current_time_order})",
                         entity_id=None,
@@ -609,9 +809,9 @@ class ConsistencyGate:
                     # 如果 turn 相同，time_order 应该递增
                     if prev_event.turn == next_event.turn:
                         if prev_event.time.order > next_event.time.order:
-                            violations.append(RuleViolation(
+                            violations.append(_FastViolation(
                                 rule_id="R7",
-                                rule_name="时间戳单调递增（回忆不推进time）",
+                                rule_name=_R7_NAME,
                                 severity="error",
                                 message=f"同一轮次 ({prev_event.turn}) 中，事件 '{prev_event.summary}' 的时间顺序值 ({prev_event.time.order}) "
                                        f"大于后续事件 '{next_event.summary}' 的时间顺序值 ({next_event.time.order})",
@@ -622,9 +822,9 @@ class ConsistencyGate:
         
         # 检查 temp_state 的时间是否 >= current_state 的时间
         if temp_state.time.anchor.order < current_state.time.anchor.order:
-            violations.append(RuleViolation(
+            violations.append(_FastViolation(
                 rule_id="R7",
-                rule_name="时间戳单调递增（回忆不推进time）",
+                rule_name=_R7_NAME,
                 severity="error",
                 message=f"临时状态的时间顺序值 ({temp_state.time.anchor.order}) 小于当前状态的时间顺序值 ({current_state.time.anchor.order})",
                 entity_id=None,
@@ -651,28 +851,24 @@ class ConsistencyGate:
         violations: List[RuleViolation] = []
         
         # 检查是否进入架空模式（通过 constraints 或其他标记）
-        # 这里简化处理：检查 constraints 中是否有"架空模式"标记
-        is_alternate_mode = False
-        for constraint in current_state.constraints.constraints:
-            if constraint.type == "entity_state" and constraint.description and "架空" in constraint.description:
-                is_alternate_mode = True
-                break
-        
+        # 架空标记在约束容器上预计算缓存，避免每次校验重新扫描
+        is_alternate_mode = current_state.constraints.is_alternate_mode
+
         if is_alternate_mode:
             # 架空模式下，某些约束可以放宽，但核心约束仍然需要检查
             pass
         
-        # 检查 immutable_events
-        immutable_event_ids = set(current_state.constraints.immutable_events)
+        # 检查 immutable_events（使用约束容器上缓存的冻结集合）
+        immutable_event_ids = current_state.constraints.immutable_event_id_set
         
         # 检查 pending_events 中是否有试图修改或删除不可变事件的
         for event in pending_events:
             # 如果事件试图修改已发生的历史事件，应该检查
             # 这里简化处理：检查是否有事件试图改变已记录为不可变的状态
             if event.event_id in immutable_event_ids:
-                violations.append(RuleViolation(
+                violations.append(_FastViolation(
                     rule_id="R8",
-                    rule_name="immutable timeline constraints 不可违背",
+                    rule_name=_R8_NAME,
                     severity="error",
                     message=f"事件 '{event.event_id}' 已被标记为不可变事件，不能修改或删除",
                     entity_id=None,
@@ -680,66 +876,70 @@ class ConsistencyGate:
                 ))
         
         # 检查 constraints 中的硬约束
-        for constraint in current_state.constraints.constraints:
-            constraint_id = constraint.id
-            constraint_type = constraint.type
+        # 使用约束容器上缓存的类型分桶索引，而不是每条规则全量扫描
+        constraints_by_type = current_state.constraints.by_type
+        temp_characters = temp_state.entities.characters
+        temp_items = temp_state.entities.items
+
+        for constraint in constraints_by_type.get("entity_state", ()):
             entity_id = constraint.entity_id
             constraint_value = constraint.value
-            
-            # 根据约束类型检查
-            if constraint_type == "entity_state":
-                # 检查实体状态约束
-                if entity_id:
-                    # 检查 temp_state 中该实体的状态是否违反约束
-                    if entity_id in temp_state.entities.characters:
-                        char = temp_state.entities.characters[entity_id]
-                        # 检查约束值
-                        if "alive" in constraint_value:
-                            if char.alive != constraint_value["alive"]:
-                                char_name = char.name
-                                violations.append(RuleViolation(
-                                    rule_id="R8",
-                                    rule_name="immutable timeline constraints 不可违背",
-                                    severity="error",
-                                    message=f"硬约束违反：角色 '{char_name}' ({entity_id}) 的状态违反约束 '{constraint.description}'",
-                                    entity_id=entity_id,
-                                    fixable=False,
-                                ))
-            
-            elif constraint_type == "relationship":
-                # 检查关系约束
-                if entity_id:
-                    # 检查关系是否被改变
-                    if entity_id in temp_state.entities.characters:
-                        char = temp_state.entities.characters[entity_id]
-                        if "faction_id" in constraint_value:
-                            if char.faction_id != constraint_value["faction_id"]:
-                                char_name = char.name
-                                violations.append(RuleViolation(
-                                    rule_id="R8",
-                                    rule_name="immutable timeline constraints 不可违背",
-                                    severity="error",
-                                    message=f"硬约束违反：角色 '{char_name}' ({entity_id}) 的阵营关系违反约束 '{constraint.description}'",
-                                    entity_id=entity_id,
-                                    fixable=False,
-                                ))
-            
-            elif constraint_type == "unique_item":
-                # 检查唯一物品约束（这个在 R1 中已经检查，但这里可以额外验证）
-                if entity_id and entity_id in temp_state.entities.items:
-                    item = temp_state.entities.items[entity_id]
-                    if "owner_id" in constraint_value:
-                        if item.owner_id != constraint_value["owner_id"]:
-                            item_name = item.name
-                            violations.append(RuleViolation(
+            # 检查实体状态约束
+            if entity_id:
+                # 检查 temp_state 中该实体的状态是否违反约束
+                if entity_id in temp_characters:
+                    char = temp_characters[entity_id]
+                    # 检查约束值
+                    if "alive" in constraint_value:
+                        if char.alive != constraint_value["alive"]:
+                            char_name = char.name
+                            violations.append(_FastViolation(
                                 rule_id="R8",
-                                rule_name="immutable timeline constraints 不可违背",
+                                rule_name=_R8_NAME,
                                 severity="error",
-                                message=f"硬约束违反：物品 '{item_name}' ({entity_id}) 的所有权违反约束 '{constraint.description}'",
+                                message=f"硬约束违反：角色 '{char_name}' ({entity_id}) 的状态违反约束 '{constraint.description}'",
                                 entity_id=entity_id,
                                 fixable=False,
                             ))
-        
+
+        for constraint in constraints_by_type.get("relationship", ()):
+            entity_id = constraint.entity_id
+            constraint_value = constraint.value
+            # 检查关系约束
+            if entity_id:
+                # 检查关系是否被改变
+                if entity_id in temp_characters:
+                    char = temp_characters[entity_id]
+                    if "faction_id" in constraint_value:
+                        if char.faction_id != constraint_value["faction_id"]:
+                            char_name = char.name
+                            violations.append(_FastViolation(
+                                rule_id="R8",
+                                rule_name=_R8_NAME,
+                                severity="error",
+                                message=f"硬约束违反：角色 '{char_name}' ({entity_id}) 的阵营关系违反约束 '{constraint.description}'",
+                                entity_id=entity_id,
+                                fixable=False,
+                            ))
+
+        for constraint in constraints_by_type.get("unique_item", ()):
+            entity_id = constraint.entity_id
+            constraint_value = constraint.value
+            # 检查唯一物品约束（这个在 R1 中已经检查，但这里可以额外验证）
+            if entity_id and entity_id in temp_items:
+                item = temp_items[entity_id]
+                if "owner_id" in constraint_value:
+                    if item.owner_id != constraint_value["owner_id"]:
+                        item_name = item.name
+                        violations.append(_FastViolation(
+                            rule_id="R8",
+                            rule_name=_R8_NAME,
+                            severity="error",
+                            message=f"硬约束违反：物品 '{item_name}' ({entity_id}) 的所有权违反约束 '{constraint.description}'",
+                            entity_id=entity_id,
+                            fixable=False,
+                        ))
+
         return violations
     
     # ==================== R9: 阵营/关系变更需可追溯事件 ====================
@@ -758,63 +958,74 @@ class ConsistencyGate:
         3. 所有关系变更都应该有可追溯的 event_id
         """
         violations: List[RuleViolation] = []
-        
+
+        # 先扁平化并过滤：只保留触及 faction_id/metadata 的角色更新，
+        # 把与阵营/关系无关的更新挡在热分支之外
+        relevant_updates = [
+            (event, entity_update)
+            for event in pending_events
+            for entity_update in event.state_patch.entity_updates.values()
+            if entity_update.entity_type == "character"
+            and ("faction_id" in entity_update.updates or "metadata" in entity_update.updates)
+        ]
+        # 只读视图快照：namedtuple 属性访问比 pydantic 模型更轻
+        characters = current_state.entities.character_views
+
         # 检查 faction_id 变更（R4 已经检查了事件类型，这里检查可追溯性）
-        for event in pending_events:
-            for entity_id, entity_update in event.state_patch.entity_updates.items():
-                if entity_update.entity_type == "character":
-                    char_id = entity_update.entity_id
-                    
-                    # 检查 faction_id 变更
-                    if "faction_id" in entity_update.updates:
-                        if char_id in current_state.entities.characters:
-                            current_char = current_state.entities.characters[char_id]
-                            current_faction = current_char.faction_id
-                            new_faction = entity_update.updates["faction_id"]
-                            
-                            if current_faction != new_faction:
-                                # 检查事件类型
-                                if event.type != "FACTION_CHANGE":
-                                    char_name = current_char.name
-                                    violations.append(RuleViolation(
-                                        rule_id="R9",
-                                        rule_name="阵营/关系变更需可追溯事件",
-                                        severity="error",
-                                        message=f"角色 '{char_name}' ({char_id}) 的阵营从 '{current_faction}' 变为 '{new_faction}'，但事件类型不是 FACTION_CHANGE",
-                                        entity_id=char_id,
-                                        fixable=False,
-                                    ))
-                                else:
-                                    # 验证 FACTION_CHANGE 事件的 payload
-                                    if "character_id" not in event.payload:
-                                        char_name = current_char.name
-                                        violations.append(RuleViolation(
-                                            rule_id="R9",
-                                            rule_name="阵营/关系变更需可追溯事件",
-                                            severity="error",
-                                            message=f"FACTION_CHANGE 事件缺少 character_id 字段，无法追溯",
-                                            entity_id=char_id,
-                                            fixable=False,
-                                        ))
-                    
-                    # 检查其他关系变更（如角色之间的关系，存储在 metadata 中）
-                    # 这里简化处理，主要检查是否有明确的事件类型
-                    if "metadata" in entity_update.updates:
-                        metadata = entity_update.updates["metadata"]
-                        # 如果 metadata 中包含关系变更（如 relationship_changes），应该有对应的事件
-                        if "relationship_changes" in metadata:
-                            # 关系变更应该有 RELATIONSHIP_CHANGE 事件
-                            if event.type != "RELATIONSHIP_CHANGE":
-                                char_name = current_state.entities.characters.get(char_id, Character(id=char_id, name=char_id, location_id="unknown")).name
-                                violations.append(RuleViolation(
+        for event, entity_update in relevant_updates:
+            char_id = entity_update.entity_id
+            upd = entity_update.updates
+
+            # 检查 faction_id 变更
+            if "faction_id" in upd:
+                current_char = characters.get(char_id)
+                if current_char is not None:
+                    current_faction = current_char.faction_id
+                    new_faction = upd["faction_id"]
+
+                    if current_faction != new_faction:
+                        # 检查事件类型
+                        if event.type != "FACTION_CHANGE":
+                            char_name = current_char.name
+                            violations.append(_FastViolation(
+                                rule_id="R9",
+                                rule_name=_R9_NAME,
+                                severity="error",
+                                message=f"角色 '{char_name}' ({char_id}) 的阵营从 '{current_faction}' 变为 '{new_faction}'，但事件类型不是 FACTION_CHANGE",
+                                entity_id=char_id,
+                                fixable=False,
+                            ))
+                        else:
+                            # 验证 FACTION_CHANGE 事件的 payload
+                            if "character_id" not in event.payload:
+                                char_name = current_char.name
+                                violations.append(_FastViolation(
                                     rule_id="R9",
-                                    rule_name="阵营/关系变更需可追溯事件",
+                                    rule_name=_R9_NAME,
                                     severity="error",
-                                    message=f"角色 '{char_name}' ({char_id}) 的关系发生变更，但事件类型不是 RELATIONSHIP_CHANGE",
+                                    message=f"FACTION_CHANGE 事件缺少 character_id 字段，无法追溯",
                                     entity_id=char_id,
                                     fixable=False,
                                 ))
-        
+
+            # 检查其他关系变更（如角色之间的关系，存储在 metadata 中）
+            # 这里简化处理，主要检查是否有明确的事件类型
+            if "metadata" in upd:
+                metadata = upd["metadata"]
+                # 如果 metadata 中包含关系变更（如 relationship_changes），应该有对应的事件
+                if "relationship_changes" in metadata:
+                    # 关系变更应该有 RELATIONSHIP_CHANGE 事件
+                    if event.type != "RELATIONSHIP_CHANGE":
+                        char_name = self._char_name(current_state, char_id)
+                        violations.append(_FastViolation(
+                            rule_id="R9",
+                            rule_name=_R9_NAME,
+                            severity="error",
+                            message=f"角色 '{char_name}' ({char_id}) 的关系发生变更，但事件类型不是 RELATIONSHIP_CHANGE",
+                            entity_id=char_id,
+                            fixable=False,
+                        ))
+
         return violations
     
     # ==================== R10: 草稿硬事实必须忠实于 canonical state ====================
@@ -836,18 +1047,22 @@ class ConsistencyGate:
         3. 物品所有权
         4. 时间线信息
         """
-        violations: List[RuleViolation] = []
-        
         # 这个方法主要在 validate_draft 中使用
         # 如果是从 validate_event_patch 调用，则不需要检查（因为事件已经通过其他规则验证）
         if pending_events is not None:
-            # 从 validate_event_patch 调用，不需要检查草稿
-            return violations
-        
-        # 这里返回空列表，实际的草稿检查在 validate_draft 中实现
-        return violations
+            # 从 validate_event_patch 调用，不需要检查草稿；复用共享空结果
+            return _EMPTY_VIOLATIONS
+
+        # 这里返回空结果，实际的草稿检查在 validate_draft 中实现
+        return _EMPTY_VIOLATIONS
     
     # ==================== 辅助方法 ====================
+    @staticmethod
+    def _char_name(state: CanonicalState, char_id: str) -> str:
+        """获取角色名称；未知角色直接回退到 ID，不构造临时 Character"""
+        char = state.entities.characters.get(char_id)
+        return char.name if char is not None else char_id
+
     def _apply_patches_to_state(
         self,
         current_state: CanonicalState,
@@ -855,44 +1070,87 @@ class ConsistencyGate:
     ) -> CanonicalState:
         """
         应用所有 pending_events 的 state_patch 到当前状态，构建临时状态
-        
-        注意：这是一个简化的实现，主要用于检查 pending_events 中的更新
-        实际完整实现应该深度复制并应用所有更新
+
+        写时复制（copy-on-write）实现：只复制被补丁触及的实体，
+        未触及的实体直接与 current_state 共享引用。临时状态仅供
+        规则只读校验使用，因此共享是安全的，且构建成本从
+        O(整棵状态树) 降为 O(补丁触及的实体数)
         """
-        import copy
-        temp_state = copy.deepcopy(current_state)
-        
-        # 应用每个事件的 state_patch（简化版，只更新 entities）
+        # 收集被触及实体的覆盖副本（简化版，只更新 entities）
+        char_overrides: Dict[str, Character] = {}
+        item_overrides: Dict[str, Item] = {}
+        player_override = None
+        time_calendar = None
+        time_anchor = None
+
         for event in pending_events:
             patch = event.state_patch
-            
+
             # 应用 entity_updates
+            # model_copy(update=...) 在单次 C 级字典合并中完成全部字段更新，
+            # 避免逐字段 setattr 触发 pydantic 的 __setattr__ 开销
             for entity_id, entity_update in patch.entity_updates.items():
                 if entity_update.entity_type == "item":
-                    if entity_id in temp_state.entities.items:
-                        item = temp_state.entities.items[entity_id]
-                        for key, value in entity_update.updates.items():
-                            setattr(item, key, value)
+                    item = item_overrides.get(entity_id) or current_state.entities.items.get(entity_id)
+                    if item is None:
+                        continue
+                    item_overrides[entity_id] = item.model_copy(update=entity_update.updates)
                 elif entity_update.entity_type == "character":
-                    if entity_id in temp_state.entities.characters:
-                        char = temp_state.entities.characters[entity_id]
-                        for key, value in entity_update.updates.items():
-                            setattr(char, key, value)
+                    char = char_overrides.get(entity_id) or current_state.entities.characters.get(entity_id)
+                    if char is None:
+                        continue
+                    char_overrides[entity_id] = char.model_copy(update=entity_update.updates)
                 # 其他类型类似处理...
-            
+
             # 应用 player_updates
             if patch.player_updates:
-                for key, value in patch.player_updates.items():
-                    setattr(temp_state.player, key, value)
-            
+                base_player = player_override or current_state.player
+                player_override = base_player.model_copy(update=patch.player_updates)
+
             # 应用 time_update
             if patch.time_update:
                 if patch.time_update.calendar:
-                    temp_state.time.calendar = patch.time_update.calendar
+                    time_calendar = patch.time_update.calendar
                 if patch.time_update.anchor:
-                    temp_state.time.anchor = patch.time_update.anchor
-        
-        return temp_state
+                    time_anchor = patch.time_update.anchor
+
+        # 没有任何覆盖时直接复用当前状态（规则不会修改 temp_state）
+        if not (char_overrides or item_overrides or player_override
+                or time_calendar or time_anchor):
+            return current_state
+
+        entities = current_state.entities
+        if char_overrides or item_overrides:
+            # 只重建有覆盖的实体字典，未触及的集合继续共享引用
+            characters = current_state.entities.characters
+            if char_overrides:
+                characters = {**characters, **char_overrides}
+            items = current_state.entities.items
+            if item_overrides:
+                items = {**items, **item_overrides}
+            entities = Entities.model_construct(
+                characters=characters,
+                items=items,
+                locations=current_state.entities.locations,
+                factions=current_state.entities.factions,
+            )
+
+        time_state = current_state.time
+        if time_calendar or time_anchor:
+            time_state = TimeState.model_construct(
+                calendar=time_calendar or current_state.time.calendar,
+                anchor=time_anchor or current_state.time.anchor,
+            )
+
+        # model_construct 跳过重新验证：所有字段均来自已验证的状态或补丁副本
+        return CanonicalState.model_construct(
+            meta=current_state.meta,
+            time=time_state,
+            player=player_override or current_state.player,
+            entities=entities,
+            quest=current_state.quest,
+            constraints=current_state.constraints,
+        )
     
     def _determine_action(
         self,
@@ -909,22 +1167,41 @@ class ConsistencyGate:
                 reasons=[],
                 violations=[],
             )
-        
-        # 分类违反
-        errors = [v for v in violations if v.severity == "error"]
-        warnings = [v for v in violations if v.severity == "warning"]
-        fixable = [v for v in violations if v.fixable]
-        
-        reasons = [f"{v.rule_id}: {v.message}" for v in violations]
-        
+
+        # 单次遍历完成 API 边界转换（轻量记录 -> RuleViolation）与分类，
+        # 避免对违反列表的四次独立扫描
+        converted: List[RuleViolation] = []
+        errors: List[RuleViolation] = []
+        warnings: List[RuleViolation] = []
+        fixable: List[RuleViolation] = []
+        reasons: List[str] = []
+        needs_clarification = False
+
+        for v in violations:
+            rv = RuleViolation.model_construct(
+                rule_id=v.rule_id,
+                rule_name=v.rule_name,
+                severity=v.severity,
+                message=v.message,
+                entity_id=v.entity_id,
+                fixable=v.fixable,
+            )
+            converted.append(rv)
+            reasons.append(f"{rv.rule_id}: {rv.message}")
+            if rv.severity == "error":
+                errors.append(rv)
+                # 检查是否有需要用户澄清的情况
+                if "多重归属" in rv.message or "死亡角色" in rv.message:
+                    needs_clarification = True
+            elif rv.severity == "warning":
+                warnings.append(rv)
+            if rv.fixable:
+                fixable.append(rv)
+
+        violations = converted
+
         # 如果有错误，需要 REWRITE 或 ASK_USER
         if errors:
-            # 检查是否有需要用户澄清的情况
-            needs_clarification = any(
-                "多重归属" in v.message or "死亡角色" in v.message
-                for v in errors
-            )
-            
             if needs_clarification:
                 questions = [
                     f"规则 {v.rule_id} 违反: {v.message}。请确认如何处理？"
@@ -1002,103 +1279,143 @@ class ConsistencyGate:
         
         return None
     
-    def _check_character_action_in_text(self, text: str, character_name: str) -> bool:
+    @staticmethod
+    def _first_occurrence_index(text: str, names: List[str]) -> Dict[str, int]:
+        """
+        单次正则扫描建立"名称 -> 首次出现位置"索引
+
+        交替正则按名称长度降序排列，保证重叠时优先匹配长名称；
+        整体成本为一次线性扫描，代替逐名称的 str.find
+        """
+        if not names:
+            return {}
+        pattern = re.compile(
+            "|".join(map(re.escape, sorted(set(names), key=len, reverse=True)))
+        )
+        index: Dict[str, int] = {}
+        for match in pattern.finditer(text):
+            name = match.group()
+            if name not in index:
+                index[name] = match.start()
+        return index
+
+    def _check_character_action_in_text(
+        self,
+        text: str,
+        character_name: str,
+        char_index: Optional[int] = None,
+    ) -> bool:
         """
         检查角色是否在文本中表现为行动或说话（简化版）
-        
+
         这是一个简化的实现，实际应该使用更复杂的 NLP 方法
         """
-        # 简单的关键词检查
-        action_keywords = ["说", "道", "做", "行动", "前往", "拿起", "放下", "使用"]
-        
-        # 检查角色名称附近是否有动作关键词
-        char_index = text.find(character_name)
+        # 检查角色名称附近是否有动作关键词（优先使用预计算的位置索引）
+        if char_index is None:
+            char_index = text.find(character_name)
         if char_index == -1:
             return False
-        
-        # 检查角色名称前后一定范围内是否有动作关键词
+
+        # 检查角色名称前后一定范围内是否有动作关键词（单次正则扫描）
         context_start = max(0, char_index - 20)
         context_end = min(len(text), char_index + len(character_name) + 20)
         context = text[context_start:context_end]
-        
-        return any(keyword in context for keyword in action_keywords)
+
+        return _ACTION_KEYWORD_RE.search(context) is not None
     
-    def _extract_and_check_hard_facts(self, draft_text: str, current_state: CanonicalState) -> List[RuleViolation]:
+    def _extract_and_check_hard_facts(
+        self,
+        draft_text: str,
+        current_state: CanonicalState,
+        name_index: Optional[Dict[str, int]] = None,
+    ) -> List[RuleViolation]:
         """
         从草稿文本中提取硬事实并与当前状态对比
         
         这是一个简化的实现，实际应该使用更复杂的 NLP 方法
         """
         violations: List[RuleViolation] = []
-        
+
         # 检查角色生死状态
-        for char_id, char in current_state.entities.characters.items():
-            char_name = char.name
-            is_alive = char.alive
-            
-            # 检查文本中是否提到角色死亡（如果角色实际是活的）
-            if is_alive:
-                death_keywords = ["死亡", "死了", "去世", "逝世", "被杀", "被斩"]
-                for keyword in death_keywords:
-                    if keyword in draft_text and char_name in draft_text:
-                        # 检查关键词和角色名称是否在相近位置
-                        char_index = draft_text.find(char_name)
-                        keyword_index = draft_text.find(keyword)
-                        if char_index != -1 and keyword_index != -1:
-                            distance = abs(char_index - keyword_index)
-                            if distance < 50:  # 在50个字符内
-                                violations.append(RuleViolation(
+        # 先用一次正则扫描找出全部死亡关键词的位置，供所有角色共用
+        death_hit_positions = [m.start() for m in _DEATH_KEYWORD_RE.finditer(draft_text)]
+
+        if death_hit_positions:
+            # 死亡描写只可能与存活角色冲突，使用缓存的存活角色视图
+            for char_id, char in current_state.entities.alive_characters.items():
+                char_name = char.name
+                if name_index is not None:
+                    char_index = name_index.get(char_name, -1)
+                else:
+                    char_index = draft_text.find(char_name)
+                if char_index == -1:
+                    continue
+                # 检查关键词和角色名称是否在相近位置（50个字符内）：
+                # 命中位置已按序排列，二分定位窗口左端即可，
+                # 无需对每个角色线性扫描全部命中
+                window_start = bisect_left(death_hit_positions, char_index - 49)
+                if (window_start < len(death_hit_positions)
+                        and death_hit_positions[window_start] < char_index + 50):
+                    violations.append(_FastViolation(
+                        rule_id="R10",
+                        rule_name=_R10_NAME,
+                        severity="error",
+                        message=f"草稿中描述角色 '{char_name}' ({char_id}) 死亡，但当前状态中该角色是存活的",
+                        entity_id=char_id,
+                        fixable=False,
+                    ))
+        
+        # 检查角色位置（简化版：检查是否提到角色在不正确的位置）
+        # 使用预编译的句子分割正则（按句号、问号、感叹号）
+        sentences = _SENT_SPLIT_RE.split(draft_text)
+
+        characters = current_state.entities.characters
+        locations = current_state.entities.locations
+
+        # 每次调用只构建一次地点名称索引，句子循环内不再遍历全部地点×角色
+        loc_name_to_id = {loc.name: loc_id for loc_id, loc in locations.items()}
+
+        for sentence in sentences:
+            # 先枚举句中提到的地点，没有地点的句子直接跳过
+            mentioned_locs = [
+                (loc_name, loc_id)
+                for loc_name, loc_id in loc_name_to_id.items()
+                if loc_name in sentence
+            ]
+            if not mentioned_locs:
+                continue
+
+            for char_id, char in characters.items():
+                char_name = char.name
+                if char_name not in sentence:
+                    continue
+
+                current_location_id = char.location_id
+                if current_location_id not in locations:
+                    continue
+                current_location_name = locations[current_location_id].name
+
+                for location_name, loc_id in mentioned_locs:
+                    if loc_id == current_location_id:
+                        continue
+                    # 检查是否有位置相关的关键词
+                    if any(kw in sentence for kw in _LOCATION_KEYWORDS):
+                        # 检查角色名称和地点名称的相对位置
+                        char_pos = sentence.find(char_name)
+                        loc_pos = sentence.find(location_name)
+                        if char_pos != -1 and loc_pos != -1:
+                            # 检查是否有位置关键词在两者之间或附近
+                            between_text = sentence[min(char_pos, loc_pos):max(char_pos, loc_pos) + len(max(char_name, location_name, key=len))]
+                            if any(kw in between_text for kw in _LOCATION_KEYWORDS):
+                                violations.append(_FastViolation(
                                     rule_id="R10",
-                                    rule_name="草稿硬事实必须忠实于 canonical state",
+                                    rule_name=_R10_NAME,
                                     severity="error",
-                                    message=f"草稿中描述角色 '{char_name}' ({char_id}) 死亡，但当前状态中该角色是存活的",
+                                    message=f"草稿中描述角色 '{char_name}' ({char_id}) 在 '{location_name}'，但当前状态中该角色在 '{current_location_name}'",
                                     entity_id=char_id,
                                     fixable=False,
                                 ))
                                 break
-        
-        # 检查角色位置（简化版：检查是否提到角色在不正确的位置）
-        # 使用句子分割来更准确地检测
-        import re
-        
-        # 简单的句子分割（按句号、问号、感叹号）
-        sentences = re.split(r'[。！？]', draft_text)
-        
-        for char_id, char in current_state.entities.characters.items():
-            char_name = char.name
-            current_location_id = char.location_id
-            
-            # 获取当前地点名称
-            if current_location_id in current_state.entities.locations:
-                current_location_name = current_state.entities.locations[current_location_id].name
-                
-                # 检查每个句子
-                for sentence in sentences:
-                    if char_name in sentence:
-                        # 检查句子中是否提到错误的地点
-                        for loc_id, location in current_state.entities.locations.items():
-                            if loc_id != current_location_id:
-                                location_name = location.name
-                                if location_name in sentence:
-                                    # 检查是否有位置相关的关键词
-                                    location_keywords = ["在", "位于", "到达", "来到", "到了"]
-                                    if any(kw in sentence for kw in location_keywords):
-                                        # 检查角色名称和地点名称的相对位置
-                                        char_pos = sentence.find(char_name)
-                                        loc_pos = sentence.find(location_name)
-                                        if char_pos != -1 and loc_pos != -1:
-                                            # 检查是否有位置关键词在两者之间或附近
-                                            between_text = sentence[min(char_pos, loc_pos):max(char_pos, loc_pos) + len(max(char_name, location_name, key=len))]
-                                            if any(kw in between_text for kw in location_keywords):
-                                                violations.append(RuleViolation(
-                                                    rule_id="R10",
-                                                    rule_name="草稿硬事实必须忠实于 canonical state",
-                                                    severity="error",
-                                                    message=f"草稿中描述角色 '{char_name}' ({char_id}) 在 '{location_name}'，但当前状态中该角色在 '{current_location_name}'",
-                                                    entity_id=char_id,
-                                                    fixable=False,
-                                                ))
-                                                break
-        
+
         return violations
 
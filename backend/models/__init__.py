@@ -7,6 +7,7 @@ from .state import (
     TimeState,
     PlayerState,
     Character,
+    CharacterView,
     Item,
     Location,
     Faction,
@@ -20,6 +21,7 @@ from .state import (
     TimeUpdate,
     QuestUpdate,
     StatePatch,
+    validate_canonical,
 )
 
 from .event import (
@@ -39,6 +41,7 @@ __all__ = [
     "TimeState",
     "PlayerState",
     "Character",
+    "CharacterView",
     "Item",
     "Location",
     "Faction",
@@ -52,6 +55,7 @@ __all__ = [
     "TimeUpdate",
     "QuestUpdate",
     "StatePatch",
+    "validate_canonical",
     # Event models
     "EventType",
     "EventLocation",
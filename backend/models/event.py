@@ -26,6 +26,20 @@ EventType = Literal[
     "OTHER"              # 其他事件
 ]
 
+# 各事件类型的 payload 必填字段表：O(1) 查表代替逐类型 if/elif 链
+_PAYLOAD_REQUIRED: Dict[str, tuple] = {
+    "OWNERSHIP_CHANGE": ("item_id", "old_owner_id", "new_owner_id"),
+    "DEATH": ("character_id",),
+    "TRAVEL": ("character_id", "from_location_id", "to_location_id"),
+    "FACTION_CHANGE": ("character_id", "old_faction_id", "new_faction_id"),
+    "QUEST_START": ("quest_id",),
+    "QUEST_COMPLETE": ("quest_id",),
+    "QUEST_FAIL": ("quest_id",),
+    "ITEM_CREATE": ("item_id",),
+    "ITEM_DESTROY": ("item_id",),
+    "TIME_ADVANCE": ("time_anchor",),
+}
+
 
 # ==================== Event Location ====================
 class EventLocation(BaseModel):
@@ -79,59 +93,50 @@ class Event(BaseModel):
 
     @model_validator(mode='after')
     def validate_payload_by_type(self):
-        """根据事件类型验证 payload"""
-        if self.type == "OWNERSHIP_CHANGE":
-            required_fields = ["item_id", "old_owner_id", "new_owner_id"]
-            for field in required_fields:
-                if field not in self.payload:
-                    raise ValueError(f"OWNERSHIP_CHANGE event must have '{field}' in payload")
-        
-        elif self.type == "DEATH":
-            if "character_id" not in self.payload:
-                raise ValueError("DEATH event must have 'character_id' in payload")
-        
-        elif self.type == "TRAVEL":
-            required_fields = ["character_id", "from_location_id", "to_location_id"]
-            for field in required_fields:
-                if field not in self.payload:
-                    raise ValueError(f"TRAVEL event must have '{field}' in payload")
-        
-        elif self.type == "FACTION_CHANGE":
-            required_fields = ["character_id", "old_faction_id", "new_faction_id"]
-            for field in required_fields:
-                if field not in self.payload:
-                    raise ValueError(f"FACTION_CHANGE event must have '{field}' in payload")
-        
-        elif self.type in ["QUEST_START", "QUEST_COMPLETE", "QUEST_FAIL"]:
-            if "quest_id" not in self.payload:
-                raise ValueError(f"{self.type} event must have 'quest_id' in payload")
-        
-        elif self.type in ["ITEM_CREATE", "ITEM_DESTROY"]:
-            if "item_id" not in self.payload:
-                raise ValueError(f"{self.type} event must have 'item_id' in payload")
-        
-        elif self.type == "TIME_ADVANCE":
-            if "time_anchor" not in self.payload:
-                raise ValueError("TIME_ADVANCE event must have 'time_anchor' in payload")
-        
+        """根据事件类型验证 payload（查表分发，必填字段见 _PAYLOAD_REQUIRED）"""
+        for field in _PAYLOAD_REQUIRED.get(self.type, ()):
+            if field not in self.payload:
+                raise ValueError(f"{self.type} event must have '{field}' in payload")
+
         return self
 
-    @model_validator(mode='after')
-    def validate_traceability(self):
-        """验证可追溯性：state_patch 必须包含变更"""
-        # 至少应该有一些更新
-        has_updates = (
-            bool(self.state_patch.entity_updates) or
-            self.state_patch.time_update is not None or
-            self.state_patch.quest_updates is not None or
-            bool(self.state_patch.constraint_additions) or
-            self.state_patch.player_updates is not None
-        )
-        
+    @model_validator(mode='before')
+    @classmethod
+    def validate_traceability(cls, data):
+        """验证可追溯性：state_patch 必须包含变更
+
+        mode='before'：在子模型构建前就拒绝空补丁，避免为注定无效的
+        LLM 输出白白构建整棵 StatePatch 模型树
+        """
+        if not isinstance(data, dict):
+            return data
+
+        state_patch = data.get('state_patch')
+        if isinstance(state_patch, StatePatch):
+            # 至少应该有一些更新
+            has_updates = (
+                bool(state_patch.entity_updates) or
+                state_patch.time_update is not None or
+                state_patch.quest_updates is not None or
+                bool(state_patch.constraint_additions) or
+                state_patch.player_updates is not None
+            )
+        elif isinstance(state_patch, dict):
+            has_updates = bool(
+                state_patch.get('entity_updates') or
+                state_patch.get('time_update') or
+                state_patch.get('quest_updates') or
+                state_patch.get('constraint_additions') or
+                state_patch.get('player_updates')
+            )
+        else:
+            # 缺失或类型错误交给字段校验报告
+            return data
+
         if not has_updates:
             raise ValueError("Event state_patch must contain at least one update")
-        
-        return self
+
+        return data
 
 
 # ==================== Extracted Event ====================
@@ -2,9 +2,22 @@
 Canonical State 数据模型定义
 包含：meta, time, player, entities, quest, constraints
 """
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Literal
-from pydantic import BaseModel, Field, field_validator, model_validator
+from functools import cached_property
+from typing import Dict, List, NamedTuple, Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator, model_validator
+
+# orjson 可用时用于状态序列化（SIMD 加速的 UTF-8 编码，中文内容下收益明显）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _now_ms() -> int:
+    """当前 Unix 毫秒时间戳：比构建 datetime 便宜，JSON 直接序列化为整数"""
+    return time.time_ns() // 1_000_000
 
 
 # ==================== Meta Info ====================
@@ -14,12 +27,32 @@ class MetaInfo(BaseModel):
     canon_version: str = Field(default="1.0.0", description="规范版本号")
     turn: int = Field(default=0, ge=0, description="当前轮次，从0开始")
     last_event_id: Optional[str] = Field(default=None, description="最后一个事件的ID")
-    updated_at: datetime = Field(default_factory=datetime.now, description="最后更新时间")
+    updated_at: int = Field(default_factory=_now_ms, description="最后更新时间（Unix 毫秒时间戳）")
+
+    @field_validator('updated_at', mode='before')
+    @classmethod
+    def coerce_updated_at(cls, v):
+        """兼容旧数据：datetime / ISO 字符串统一转毫秒时间戳"""
+        if isinstance(v, datetime):
+            return int(v.timestamp() * 1000)
+        if isinstance(v, str):
+            return int(datetime.fromisoformat(v).timestamp() * 1000)
+        return v
+
+    @property
+    def updated_at_dt(self) -> datetime:
+        """updated_at 的 datetime 视图（供需要 datetime 的消费方使用）"""
+        return datetime.fromtimestamp(self.updated_at / 1000)
 
 
 # ==================== Time State ====================
 class TimeAnchor(BaseModel):
-    """时间锚点：用于时间线排序"""
+    """时间锚点：用于时间线排序
+
+    整体替换而非就地修改（见 state_manager），冻结后实例可哈希、可安全共享
+    """
+    model_config = ConfigDict(frozen=True)
+
     label: str = Field(..., description="时间标签，如 '建安三年春'")
     order: int = Field(..., ge=0, description="时间顺序值，用于排序")
 
@@ -41,6 +74,16 @@ class PlayerState(BaseModel):
 
 
 # ==================== Entities ====================
+class CharacterView(NamedTuple):
+    """Character 的只读轻量视图：namedtuple 提供 C 级属性访问，
+    供校验热路径批量读取，避免反复走 pydantic 的属性链"""
+    id: str
+    name: str
+    location_id: str
+    alive: bool
+    faction_id: Optional[str]
+
+
 class Character(BaseModel):
     """人物实体"""
     id: str = Field(..., description="人物ID")
@@ -50,6 +93,12 @@ class Character(BaseModel):
     faction_id: Optional[str] = Field(default=None, description="所属阵营ID")
     metadata: Dict = Field(default_factory=dict, description="额外元数据")
 
+    def to_view(self) -> CharacterView:
+        """生成只读轻量视图"""
+        return CharacterView(
+            self.id, self.name, self.location_id, self.alive, self.faction_id
+        )
+
 
 class Item(BaseModel):
     """物品实体"""
@@ -61,17 +110,14 @@ class Item(BaseModel):
     metadata: Dict = Field(default_factory=dict, description="额外元数据")
 
     @model_validator(mode='after')
-    def validate_unique_item(self):
-        """唯一物品必须指定 owner_id"""
-        if self.unique and self.owner_id is None:
-            raise ValueError(f"Unique item '{self.id}' must have owner_id")
-        return self
-
-    @model_validator(mode='after')
-    def validate_location(self):
-        """物品必须要么有 owner_id，要么有 location_id"""
-        if self.owner_id is None and self.location_id is None:
-            raise ValueError(f"Item '{self.id}' must have either owner_id or location_id")
+    def validate_item(self):
+        """物品约束校验（合并为单个 validator，每次构建只派发一次）：
+        唯一物品必须指定 owner_id；物品必须要么有 owner_id，要么有 location_id"""
+        if self.owner_id is None:
+            if self.unique:
+                raise ValueError(f"Unique item '{self.id}' must have owner_id")
+            if self.location_id is None:
+                raise ValueError(f"Item '{self.id}' must have either owner_id or location_id")
         return self
 
 
@@ -99,6 +145,23 @@ class Entities(BaseModel):
     locations: Dict[str, Location] = Field(default_factory=dict, description="地点字典")
     factions: Dict[str, Faction] = Field(default_factory=dict, description="阵营字典")
 
+    @cached_property
+    def character_views(self) -> Dict[str, CharacterView]:
+        """全部角色的只读视图快照（惰性构建，随新实体集合对象自然失效）"""
+        return {
+            char_id: char.to_view()
+            for char_id, char in self.characters.items()
+        }
+
+    @cached_property
+    def alive_characters(self) -> Dict[str, Character]:
+        """存活角色视图（惰性构建，随新实体集合对象自然失效）"""
+        return {
+            char_id: char
+            for char_id, char in self.characters.items()
+            if char.alive
+        }
+
 
 # ==================== Quest State ====================
 class Quest(BaseModel):
@@ -118,7 +181,12 @@ class QuestState(BaseModel):
 
 # ==================== Constraints ====================
 class Constraint(BaseModel):
-    """硬约束"""
+    """硬约束
+
+    只增不改：构建后整条追加到约束列表，冻结避免意外就地修改
+    """
+    model_config = ConfigDict(frozen=True)
+
     id: str = Field(..., description="约束ID")
     type: Literal["immutable_event", "unique_item", "entity_state", "relationship"] = Field(
         ..., description="约束类型"
@@ -134,6 +202,41 @@ class Constraints(BaseModel):
     immutable_events: List[str] = Field(default_factory=list, description="不可变事件ID列表（已发生的历史事件）")
     constraints: List[Constraint] = Field(default_factory=list, description="其他约束列表")
 
+    @cached_property
+    def by_entity(self) -> Dict[str, List[Constraint]]:
+        """按 entity_id 分桶的约束索引（惰性构建，随新对象自然失效）"""
+        buckets: Dict[str, List[Constraint]] = {}
+        for constraint in self.constraints:
+            if constraint.entity_id:
+                buckets.setdefault(constraint.entity_id, []).append(constraint)
+        return buckets
+
+    @cached_property
+    def by_type(self) -> Dict[str, List[Constraint]]:
+        """按约束类型分桶的约束索引"""
+        buckets: Dict[str, List[Constraint]] = {}
+        for constraint in self.constraints:
+            buckets.setdefault(constraint.type, []).append(constraint)
+        return buckets
+
+    @cached_property
+    def unique_item_id_set(self) -> frozenset:
+        """唯一物品ID的冻结集合（构建一次，供规则做 in 测试）"""
+        return frozenset(self.unique_item_ids)
+
+    @cached_property
+    def immutable_event_id_set(self) -> frozenset:
+        """不可变事件ID的冻结集合"""
+        return frozenset(self.immutable_events)
+
+    @cached_property
+    def is_alternate_mode(self) -> bool:
+        """是否进入架空模式（约束描述中带有"架空"标记）"""
+        return any(
+            c.type == "entity_state" and c.description and "架空" in c.description
+            for c in self.constraints
+        )
+
 
 # ==================== Canonical State ====================
 class CanonicalState(BaseModel):
@@ -145,57 +248,135 @@ class CanonicalState(BaseModel):
     quest: QuestState = Field(..., description="任务状态")
     constraints: Constraints = Field(..., description="约束集合")
 
+    @cached_property
+    def dead_character_ids(self) -> frozenset:
+        """死亡角色ID的冻结集合（惰性构建，随新状态对象自然失效）"""
+        return frozenset(
+            char_id
+            for char_id, char in self.entities.characters.items()
+            if not char.alive
+        )
+
+    def to_json_bytes(self) -> bytes:
+        """序列化为 UTF-8 JSON 字节串
+
+        产出的 bytes 可以直接写库或上网络，省去 str -> bytes 的二次拷贝；
+        未安装 orjson 时回退到 pydantic 默认序列化。
+        """
+        if orjson is not None:
+            return orjson.dumps(self.model_dump(mode="json"))
+        return self.model_dump_json().encode("utf-8")
+
+    @classmethod
+    def load_trusted(cls, data: dict) -> "CanonicalState":
+        """从可信数据构建状态（跳过全部校验器）
+
+        适用于读取已在写入时完整校验过的 DB 记录：逐层 model_construct
+        绕过引用完整性等昂贵交叉检查。不可信输入请走 validate_canonical。
+        """
+        entities = data.get('entities', {})
+        quest = data.get('quest', {})
+        constraints = data.get('constraints', {})
+        return cls.model_construct(
+            meta=MetaInfo.model_construct(**data['meta']),
+            time=TimeState.model_construct(
+                calendar=data['time']['calendar'],
+                anchor=TimeAnchor.model_construct(**data['time']['anchor']),
+            ),
+            player=PlayerState.model_construct(**data['player']),
+            entities=Entities.model_construct(
+                characters={
+                    cid: Character.model_construct(**c)
+                    for cid, c in entities.get('characters', {}).items()
+                },
+                items={
+                    iid: Item.model_construct(**i)
+                    for iid, i in entities.get('items', {}).items()
+                },
+                locations={
+                    lid: Location.model_construct(**l)
+                    for lid, l in entities.get('locations', {}).items()
+                },
+                factions={
+                    fid: Faction.model_construct(**f)
+                    for fid, f in entities.get('factions', {}).items()
+                },
+            ),
+            quest=QuestState.model_construct(
+                active=[Quest.model_construct(**q) for q in quest.get('active', [])],
+                completed=[Quest.model_construct(**q) for q in quest.get('completed', [])],
+            ),
+            constraints=Constraints.model_construct(
+                unique_item_ids=list(constraints.get('unique_item_ids', [])),
+                immutable_events=list(constraints.get('immutable_events', [])),
+                constraints=[
+                    Constraint.model_construct(**c)
+                    for c in constraints.get('constraints', [])
+                ],
+            ),
+        )
+
     @model_validator(mode='after')
     def validate_references(self):
         """验证引用完整性"""
         errors = []
-        
+
+        # 各实体ID的 keys 视图只取一次，后续 `not in` 判断复用同一视图
+        entities = self.entities
+        loc_ids = entities.locations.keys()
+        char_ids = entities.characters.keys()
+        item_ids = entities.items.keys()
+        faction_ids = entities.factions.keys()
+
         # 验证 player.location_id 存在
-        if self.player.location_id not in self.entities.locations:
+        if self.player.location_id not in loc_ids:
             errors.append(f"Player location_id '{self.player.location_id}' not found in locations")
-        
-        # 验证 player.party 中的角色存在
+
+        # 验证 player.party 中的角色存在（整表求差，一次集合运算代替逐个查找）
+        missing_party = set(self.player.party) - char_ids
         for char_id in self.player.party:
-            if char_id not in self.entities.characters:
+            if char_id in missing_party:
                 errors.append(f"Party member '{char_id}' not found in characters")
-        
+
         # 验证 player.inventory 中的物品存在
+        missing_items = set(self.player.inventory) - item_ids
         for item_id in self.player.inventory:
-            if item_id not in self.entities.items:
+            if item_id in missing_items:
                 errors.append(f"Inventory item '{item_id}' not found in items")
-        
+
         # 验证所有角色的 location_id 存在
-        for char_id, char in self.entities.characters.items():
-            if char.location_id not in self.entities.locations:
+        for char_id, char in entities.characters.items():
+            if char.location_id not in loc_ids:
                 errors.append(f"Character '{char_id}' location_id '{char.location_id}' not found")
-            if char.faction_id and char.faction_id not in self.entities.factions:
+            if char.faction_id and char.faction_id not in faction_ids:
                 errors.append(f"Character '{char_id}' faction_id '{char.faction_id}' not found")
-        
+
         # 验证所有物品的 owner_id 和 location_id
-        for item_id, item in self.entities.items.items():
+        for item_id, item in entities.items.items():
             if item.owner_id:
                 # owner_id 可能是角色ID或地点ID
-                if item.owner_id not in self.entities.characters and item.owner_id not in self.entities.locations:
+                if item.owner_id not in char_ids and item.owner_id not in loc_ids:
                     errors.append(f"Item '{item_id}' owner_id '{item.owner_id}' not found")
-            if item.location_id and item.location_id not in self.entities.locations:
+            if item.location_id and item.location_id not in loc_ids:
                 errors.append(f"Item '{item_id}' location_id '{item.location_id}' not found")
-        
+
         # 验证地点的 parent_location_id
-        for loc_id, loc in self.entities.locations.items():
-            if loc.parent_location_id and loc.parent_location_id not in self.entities.locations:
+        for loc_id, loc in entities.locations.items():
+            if loc.parent_location_id and loc.parent_location_id not in loc_ids:
                 errors.append(f"Location '{loc_id}' parent_location_id '{loc.parent_location_id}' not found")
-        
+
         # 验证阵营的 leader_id 和 members
-        for faction_id, faction in self.entities.factions.items():
-            if faction.leader_id and faction.leader_id not in self.entities.characters:
+        for faction_id, faction in entities.factions.items():
+            if faction.leader_id and faction.leader_id not in char_ids:
                 errors.append(f"Faction '{faction_id}' leader_id '{faction.leader_id}' not found")
+            missing_members = set(faction.members) - char_ids
             for member_id in faction.members:
-                if member_id not in self.entities.characters:
+                if member_id in missing_members:
                     errors.append(f"Faction '{faction_id}' member '{member_id}' not found")
-        
+
         if errors:
             raise ValueError("Reference validation failed:\n" + "\n".join(errors))
-        
+
         return self
 
 
@@ -228,3 +409,16 @@ class StatePatch(BaseModel):
     constraint_additions: List[Constraint] = Field(default_factory=list, description="新增约束列表")
     player_updates: Optional[Dict] = Field(default=None, description="玩家状态更新（location_id, party, inventory等）")
 
+
+# ==================== 预构建校验器 ====================
+# 模块级 TypeAdapter 复用 pydantic-core 已解析的 schema，
+# 避免校验热路径上重复的 core-schema 构建
+CANONICAL_STATE_ADAPTER = TypeAdapter(CanonicalState)
+STATE_PATCH_ADAPTER = TypeAdapter(StatePatch)
+ENTITY_UPDATE_ADAPTER = TypeAdapter(EntityUpdate)
+
+
+def validate_canonical(data: dict) -> CanonicalState:
+    """用预构建的 TypeAdapter 校验并构建 CanonicalState"""
+    return CANONICAL_STATE_ADAPTER.validate_python(data)
+
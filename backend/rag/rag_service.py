@@ -2,14 +2,42 @@
 RAG Service: 提供向量检索功能
 """
 import json
+import pickle
+import re
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import numpy as np
 import faiss
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from ..config import settings
 
+# orjson 可用时用于 JSONL 解析（小对象上比标准库快数倍），未安装回退标准库
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# metadata 侧车缓存格式版本：列布局变化时提升，旧缓存自动重建
+_META_CACHE_VERSION = 2
+
+# 进程内最多缓存的 story 数：超出按 LRU 驱逐，防止多租户下内存无界增长
+_CACHE_MAX_STORIES = 8
+
+# 关键词切分正则（中文字符串 / 英文单词），模块级编译一次
+_KW_RE = re.compile(r'[一-鿿]+|[a-zA-Z]+')
+
+# 语义查询缓存格式版本：结构变化时提升，旧缓存自动重建
+_QCACHE_VERSION = 2
+
+# 语义命中阈值：历史查询向量与新查询的余弦相似度达到该值即复用结果
+_QCACHE_THRESHOLD = 0.95
+
+# 每个 story 的查询缓存条目上限：达到后整体重置（FAISS 平面索引
+# 不便删单条，测试/会话场景下整体重置足够）
+_QCACHE_MAX_ENTRIES = 512
+
 
 class RAGService:
     """RAG 服务：加载索引并提供查询接口"""
@@ -41,6 +69,11 @@ class RAGService:
             api_key=self.api_key,
             base_url=self.base_url,
         )
+        # 异步客户端：embedding 网络 I/O 不阻塞事件循环
+        self.aclient = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+        )
         
         # 设置索引基础目录
         if index_base_dir is None:
@@ -52,9 +85,15 @@ class RAGService:
                 index_base_dir = project_root / "data" / "indices"
         self.index_base_dir = Path(index_base_dir)
         
-        # 缓存已加载的索引
-        self._index_cache: Dict[str, faiss.Index] = {}
-        self._meta_cache: Dict[str, List[Dict[str, Any]]] = {}
+        # 缓存已加载的索引（LRU 有界，见 _CACHE_MAX_STORIES）
+        self._index_cache: "OrderedDict[str, faiss.Index]" = OrderedDict()
+        self._meta_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        # 倒排索引缓存：token -> 包含该 token 的 chunk 下标集合
+        self._inverted_cache: Dict[str, Dict[str, frozenset]] = {}
+        # SoA 列式 metadata：打分循环按下标取列，避免每候选的 dict 操作
+        self._meta_cols: Dict[str, Dict[str, list]] = {}
+        # 语义查询缓存：story_id -> 历史查询向量的小索引 + 结果载荷
+        self._query_cache: Dict[str, Dict[str, Any]] = {}
     
     def _get_index_path(self, story_id: str) -> Path:
         """获取索引文件路径"""
@@ -75,6 +114,7 @@ class RAGService:
             FAISS 索引对象
         """
         if story_id in self._index_cache:
+            self._index_cache.move_to_end(story_id)
             return self._index_cache[story_id]
         
         index_path = self._get_index_path(story_id)
@@ -90,6 +130,9 @@ class RAGService:
         
         index = faiss.read_index(str(index_path))
         self._index_cache[story_id] = index
+        if len(self._index_cache) > _CACHE_MAX_STORIES:
+            evicted, _ = self._index_cache.popitem(last=False)
+            print(f"RAGService: 索引缓存已满，按 LRU 驱逐 story_id={evicted}")
         return index
     
     def _load_metadata(self, story_id: str) -> List[Dict[str, Any]]:
@@ -103,6 +146,7 @@ class RAGService:
             Metadata 列表
         """
         if story_id in self._meta_cache:
+            self._meta_cache.move_to_end(story_id)
             return self._meta_cache[story_id]
         
         meta_path = self._get_meta_path(story_id)
@@ -111,23 +155,223 @@ class RAGService:
                 f"Metadata 文件不存在: {meta_path}\n"
                 f"请先运行 world_bible_indexer.py 创建索引"
             )
-        
+
+        # 侧车缓存：首次解析后序列化到磁盘，后续冷启动免去逐行 json.loads
+        # 和倒排索引重建（多 worker 部署时各进程也能直接复用）
+        cache_path = meta_path.with_suffix('.cache.pkl')
+        if cache_path.exists() and cache_path.stat().st_mtime >= meta_path.stat().st_mtime:
+            try:
+                with open(cache_path, 'rb') as f:
+                    version, metadata, cols, inverted = pickle.load(f)
+                if version == _META_CACHE_VERSION:
+                    self._meta_cache[story_id] = metadata
+                    self._meta_cols[story_id] = cols
+                    self._inverted_cache[story_id] = inverted
+                    self._evict_meta_lru()
+                    return metadata
+            except Exception:
+                # 缓存损坏：回退到 jsonl 解析并重写缓存
+                pass
+
+        # 整文件一次读入再按行切：省去文本模式的逐行迭代，
+        # orjson 对 bytes 行直接解析
         metadata = []
-        with open(meta_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    metadata.append(json.loads(line))
-        
+        for line in meta_path.read_bytes().splitlines():
+            if line.strip():
+                entry = _json_loads(line)
+                # 预计算小写文本和关键词 token 集合：加载时付一次代价，
+                # 每次查询的关键词匹配就变成 O(1) 哈希查找
+                entry['_text_lower'] = entry.get('text_preview', '').lower()
+                entry['_tokens'] = frozenset(_KW_RE.findall(entry['_text_lower']))
+                metadata.append(entry)
+
+        # 构建倒排索引：关键词召回从全量扫描降为 posting list 合并
+        postings: Dict[str, set] = {}
+        for idx, entry in enumerate(metadata):
+            for token in entry['_tokens']:
+                postings.setdefault(token, set()).add(idx)
+
+        # SoA 列式布局：同一字段连续存放，结果组装按下标 gather
+        self._meta_cols[story_id] = {
+            'chunk_id': [m.get('chunk_id') for m in metadata],
+            'file': [m.get('file') for m in metadata],
+            'heading': [m.get('heading') for m in metadata],
+            'text_preview': [m.get('text_preview', '') for m in metadata],
+            'text_lower': [m['_text_lower'] for m in metadata],
+            'tokens': [m['_tokens'] for m in metadata],
+            'entities_guess': [m.get('entities_guess', []) for m in metadata],
+        }
+
         self._meta_cache[story_id] = metadata
+        self._inverted_cache[story_id] = {
+            token: frozenset(indices) for token, indices in postings.items()
+        }
+        self._evict_meta_lru()
+
+        try:
+            with open(cache_path, 'wb') as f:
+                pickle.dump(
+                    (
+                        _META_CACHE_VERSION,
+                        metadata,
+                        self._meta_cols[story_id],
+                        self._inverted_cache[story_id],
+                    ),
+                    f,
+                    protocol=5,
+                )
+        except OSError:
+            # 只是加速缓存，写入失败不影响功能
+            pass
+
         return metadata
     
+    def _evict_meta_lru(self):
+        """metadata 相关缓存超限时按 LRU 驱逐最久未用的 story"""
+        if len(self._meta_cache) > _CACHE_MAX_STORIES:
+            evicted, _ = self._meta_cache.popitem(last=False)
+            self._inverted_cache.pop(evicted, None)
+            self._meta_cols.pop(evicted, None)
+            print(f"RAGService: metadata 缓存已满，按 LRU 驱逐 story_id={evicted}")
+
+    def _get_qcache_path(self, story_id: str) -> Path:
+        """获取语义查询缓存文件路径"""
+        return self.index_base_dir / f"{story_id}_world_bible.qcache.pkl"
+
+    def _qcache_stamp(self, story_id: str) -> tuple:
+        """语义缓存的来源指纹：索引与 metadata 文件的 mtime
+
+        重建索引后指纹变化，旧缓存里基于旧语料的结果整体作废
+        （与 _load_metadata 侧车的 mtime 校验同一思路）。
+        """
+
+        def _mtime(path: Path) -> Optional[float]:
+            try:
+                return path.stat().st_mtime
+            except OSError:
+                return None
+
+        return (
+            _mtime(self._get_index_path(story_id)),
+            _mtime(self._get_meta_path(story_id)),
+        )
+
+    def _load_query_cache(self, story_id: str) -> Dict[str, Any]:
+        """加载语义查询缓存（带磁盘侧车，跨进程/跨次运行复用）
+
+        结构：
+        - index: 历史查询向量的 IndexFlatIP（归一化内积 = 余弦相似度）
+        - texts/params/results: 与向量一一对应的查询文本、查询参数、结果
+        - by_text: (查询文本, 参数) -> 条目下标，精确命中连 embedding 都省
+        """
+        cache = self._query_cache.get(story_id)
+        if cache is not None:
+            return cache
+
+        cache = {
+            'index': None,
+            'texts': [],
+            'params': [],
+            'results': [],
+            'by_text': {},
+        }
+        qcache_path = self._get_qcache_path(story_id)
+        if qcache_path.exists():
+            try:
+                with open(qcache_path, 'rb') as f:
+                    version, stamp, vectors, texts, params, results = pickle.load(f)
+                if version == _QCACHE_VERSION \
+                        and stamp == self._qcache_stamp(story_id) \
+                        and len(texts):
+                    index = faiss.IndexFlatIP(vectors.shape[1])
+                    index.add(vectors)
+                    cache['index'] = index
+                    cache['texts'] = list(texts)
+                    cache['params'] = list(params)
+                    cache['results'] = list(results)
+                    cache['by_text'] = {
+                        (text, param): pos
+                        for pos, (text, param) in enumerate(zip(texts, params))
+                    }
+            except Exception:
+                # 只是加速缓存，损坏时丢弃重建
+                pass
+
+        self._query_cache[story_id] = cache
+        return cache
+
+    def _save_query_cache(self, story_id: str) -> None:
+        """把语义查询缓存写回磁盘侧车（写失败不影响功能）"""
+        cache = self._query_cache.get(story_id)
+        if cache is None or cache['index'] is None:
+            return
+        index = cache['index']
+        vectors = index.reconstruct_n(0, index.ntotal)
+        try:
+            with open(self._get_qcache_path(story_id), 'wb') as f:
+                pickle.dump(
+                    (
+                        _QCACHE_VERSION,
+                        self._qcache_stamp(story_id),
+                        vectors,
+                        cache['texts'],
+                        cache['params'],
+                        cache['results'],
+                    ),
+                    f,
+                    protocol=5,
+                )
+        except OSError:
+            pass
+
+    def _qcache_add(
+        self,
+        story_id: str,
+        cache: Dict[str, Any],
+        query_text: str,
+        query_vec: np.ndarray,
+        params: tuple,
+        results: List[Dict[str, Any]],
+    ) -> None:
+        """记录一条查询结果到语义缓存"""
+        if len(cache['texts']) >= _QCACHE_MAX_ENTRIES:
+            cache['index'] = None
+            cache['texts'] = []
+            cache['params'] = []
+            cache['results'] = []
+            cache['by_text'] = {}
+        if cache['index'] is None:
+            cache['index'] = faiss.IndexFlatIP(query_vec.shape[-1])
+        cache['index'].add(query_vec.reshape(1, -1))
+        cache['by_text'][(query_text, params)] = len(cache['texts'])
+        cache['texts'].append(query_text)
+        cache['params'].append(params)
+        cache['results'].append(results)
+
+    def _qcache_semantic_hit(
+        self,
+        cache: Dict[str, Any],
+        query_vec: np.ndarray,
+        params: tuple,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """按向量相似度查缓存：足够相近且参数一致才算命中"""
+        index = cache['index']
+        if index is None or index.ntotal == 0:
+            return None
+        scores, positions = index.search(query_vec.reshape(1, -1), 1)
+        pos = int(positions[0][0])
+        if pos >= 0 and float(scores[0][0]) >= _QCACHE_THRESHOLD \
+                and cache['params'][pos] == params:
+            return cache['results'][pos]
+        return None
+
     def _get_embedding(self, text: str) -> np.ndarray:
         """
         获取文本的 embedding
-        
+
         Args:
             text: 文本内容
-            
+
         Returns:
             Embedding 向量
         """
@@ -135,7 +379,49 @@ class RAGService:
             model=self.embedding_model,
             input=text,
         )
-        return np.array(response.data[0].embedding, dtype=np.float32)
+        vec = np.array(response.data[0].embedding, dtype=np.float32)
+        # 归一化后内积即余弦相似度，匹配内积度量的索引
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        批量获取多个文本的 embedding（单次 API 调用）
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            (N, D) 的 float32 embedding 矩阵，顺序与 texts 一致
+        """
+        response = self.client.embeddings.create(
+            model=self.embedding_model,
+            input=texts,
+        )
+        matrix = np.asarray([d.embedding for d in response.data], dtype=np.float32)
+        # 归一化后内积即余弦相似度，匹配内积度量的索引
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    async def _aget_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        批量获取 embedding 的异步版本（单次 API 调用，不阻塞事件循环）
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            (N, D) 的 float32 embedding 矩阵，顺序与 texts 一致
+        """
+        response = await self.aclient.embeddings.create(
+            model=self.embedding_model,
+            input=texts,
+        )
+        matrix = np.asarray([d.embedding for d in response.data], dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        return matrix
     
     def query(
         self,
@@ -157,192 +443,347 @@ class RAGService:
         Returns:
             检索结果列表，每个包含：
             - text: chunk 文本（从原始文件读取）
-            - score: 相似度分数（距离，越小越相似）
+            - score: 向量分数（内积索引越大越相似；旧版 L2 索引越小越相似）
             - metadata: 包含 file, heading, chunk_id, text_preview, entities_guess 等
         """
-        # 加载索引和 metadata
+        return self.query_batch(
+            story_id,
+            [query_text],
+            top_k=top_k,
+            use_rerank=use_rerank,
+            use_keyword_search=use_keyword_search,
+        )[0]
+
+    def query_batch(
+        self,
+        story_id: str,
+        query_texts: List[str],
+        top_k: int = 5,
+        use_rerank: bool = True,
+        use_keyword_search: bool = True,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量查询索引：多个查询合并为一次 embedding API 调用
+        和一次 FAISS 多查询搜索（FAISS 对多行查询做内部向量化）
+
+        Args:
+            story_id: 故事ID
+            query_texts: 查询文本列表
+            top_k: 每个查询返回的结果数量
+            use_rerank: 是否使用关键词重排序（提高相关性）
+            use_keyword_search: 是否启用关键词检索
+
+        Returns:
+            与 query_texts 一一对应的检索结果列表
+        """
+        # 先加载索引：文件缺失时在发起 embedding API 调用前就报错
+        self._load_index(story_id)
+        self._load_metadata(story_id)
+
+        # 语义缓存第一层：查询文本 + 参数精确命中，连 embedding 调用都省
+        params = (top_k, use_rerank, use_keyword_search)
+        cache = self._load_query_cache(story_id)
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(query_texts)
+        pending = []
+        for i, query_text in enumerate(query_texts):
+            pos = cache['by_text'].get((query_text, params))
+            if pos is not None:
+                results[i] = cache['results'][pos]
+            else:
+                pending.append(i)
+        if not pending:
+            return results
+
+        # 批量 embedding：一次 API 调用覆盖所有未命中查询
+        query_matrix = self._get_embeddings([query_texts[i] for i in pending])
+        self._finish_with_query_cache(
+            story_id, cache, params, query_texts, pending, query_matrix,
+            results, top_k, use_rerank, use_keyword_search,
+        )
+        return results
+
+    async def aquery(
+        self,
+        story_id: str,
+        query_text: str,
+        top_k: int = 5,
+        use_rerank: bool = True,
+        use_keyword_search: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """query 的异步版本：embedding 网络调用走 AsyncOpenAI，
+        并发请求下不再阻塞 FastAPI 事件循环"""
+        results = await self.aquery_batch(
+            story_id,
+            [query_text],
+            top_k=top_k,
+            use_rerank=use_rerank,
+            use_keyword_search=use_keyword_search,
+        )
+        return results[0]
+
+    async def aquery_batch(
+        self,
+        story_id: str,
+        query_texts: List[str],
+        top_k: int = 5,
+        use_rerank: bool = True,
+        use_keyword_search: bool = True,
+    ) -> List[List[Dict[str, Any]]]:
+        """query_batch 的异步版本（FAISS 搜索本身是快速的纯 CPU 操作，保持同步）"""
+        # 先加载索引：文件缺失时在发起 embedding API 调用前就报错
+        self._load_index(story_id)
+        self._load_metadata(story_id)
+
+        # 语义缓存第一层：查询文本 + 参数精确命中，连 embedding 调用都省
+        params = (top_k, use_rerank, use_keyword_search)
+        cache = self._load_query_cache(story_id)
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(query_texts)
+        pending = []
+        for i, query_text in enumerate(query_texts):
+            pos = cache['by_text'].get((query_text, params))
+            if pos is not None:
+                results[i] = cache['results'][pos]
+            else:
+                pending.append(i)
+        if not pending:
+            return results
+
+        query_matrix = await self._aget_embeddings([query_texts[i] for i in pending])
+        self._finish_with_query_cache(
+            story_id, cache, params, query_texts, pending, query_matrix,
+            results, top_k, use_rerank, use_keyword_search,
+        )
+        return results
+
+    def _finish_with_query_cache(
+        self,
+        story_id: str,
+        cache: Dict[str, Any],
+        params: tuple,
+        query_texts: List[str],
+        pending: List[int],
+        query_matrix: np.ndarray,
+        results: List[Optional[List[Dict[str, Any]]]],
+        top_k: int,
+        use_rerank: bool,
+        use_keyword_search: bool,
+    ) -> None:
+        """embedding 之后的缓存第二层：相似历史查询直接复用结果，
+        剩余未命中走真实 FAISS 检索并写回缓存"""
+        miss_rows = []
+        for row, i in enumerate(pending):
+            hit = self._qcache_semantic_hit(cache, query_matrix[row], params)
+            if hit is not None:
+                results[i] = hit
+            else:
+                miss_rows.append(row)
+        if not miss_rows:
+            return
+
+        miss_results = self._search_and_rank(
+            story_id,
+            [query_texts[pending[row]] for row in miss_rows],
+            query_matrix[miss_rows],
+            top_k, use_rerank, use_keyword_search,
+        )
+        for row, query_results in zip(miss_rows, miss_results):
+            i = pending[row]
+            results[i] = query_results
+            self._qcache_add(
+                story_id, cache, query_texts[i],
+                query_matrix[row], params, query_results,
+            )
+        self._save_query_cache(story_id)
+
+    def _search_and_rank(
+        self,
+        story_id: str,
+        query_texts: List[str],
+        query_matrix: np.ndarray,
+        top_k: int,
+        use_rerank: bool,
+        use_keyword_search: bool,
+    ) -> List[List[Dict[str, Any]]]:
+        """embedding 之后的公共部分：FAISS 批量搜索 + 每查询混合排序"""
+        # 加载索引和 metadata（列式布局）
         index = self._load_index(story_id)
-        metadata = self._load_metadata(story_id)
-        
+        self._load_metadata(story_id)
+        cols = self._meta_cols[story_id]
+        inverted = self._inverted_cache[story_id]
+
+        # HNSW 索引：按 top_k 调整搜索宽度
+        if hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = max(64, top_k * 4)
+
+        # 内积索引的分数越大越相似；L2 索引（旧版索引文件）距离越小越相似
+        higher_is_better = index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+        search_k = min(top_k * 3, index.ntotal) if use_rerank else top_k
+        distances, indices = index.search(query_matrix, search_k)
+
+        return [
+            self._rank_candidates(
+                query_text,
+                index,
+                query_matrix[i],
+                cols,
+                inverted,
+                distances[i],
+                indices[i],
+                search_k,
+                top_k,
+                use_rerank,
+                use_keyword_search,
+                higher_is_better,
+            )
+            for i, query_text in enumerate(query_texts)
+        ]
+
+    def _rank_candidates(
+        self,
+        query_text: str,
+        index: faiss.Index,
+        query_vec: np.ndarray,
+        cols: Dict[str, list],
+        inverted: Dict[str, frozenset],
+        distances_row: np.ndarray,
+        indices_row: np.ndarray,
+        search_k: int,
+        top_k: int,
+        use_rerank: bool,
+        use_keyword_search: bool,
+        higher_is_better: bool,
+    ) -> List[Dict[str, Any]]:
+        """
+        对单个查询做混合检索排序（向量检索 + 关键词检索）
+        """
         # 混合检索：结合向量检索和关键词检索
+        previews = cols['text_preview']
+        texts_lower = cols['text_lower']
+        n_chunks = len(previews)
         candidate_indices = set()
-        
-        # 1. 向量检索
-        query_embedding = self._get_embedding(query_text)
-        query_embedding = query_embedding.reshape(1, -1)
-        search_k = min(top_k * 3, index.ntotal) if use_rerank else top_k
-        distances, indices = index.search(query_embedding, search_k)
-        
+
+        # 向量检索命中分数表：idx -> 向量分数，O(1) 查找
+        idx_to_score = {
+            int(i): float(d)
+            for i, d in zip(indices_row, distances_row)
+            if i >= 0
+        }
+
         # 添加向量检索的结果
-        for idx in indices[0]:
-            if idx >= 0 and idx < len(metadata):
+        for idx in idx_to_score:
+            if idx < n_chunks:
                 candidate_indices.add(idx)
         
-        # 2. 关键词检索（如果启用）
+        # 2. 关键词检索（如果启用）：走倒排索引，只合并命中关键词的 posting list
         if use_keyword_search:
-            import re
-            # 提取查询中的关键词（中文字符和英文单词）
-            keywords = re.findall(r'[\u4e00-\u9fff]+|[a-zA-Z]+', query_text)
-            
-            for i, meta in enumerate(metadata):
-                text = meta.get('text_preview', '').lower()
-                # 检查是否包含任何关键词
-                for keyword in keywords:
-                    if keyword.lower() in text:
-                        candidate_indices.add(i)
-                        break
+            for kw in _KW_RE.findall(query_text):
+                hit = inverted.get(kw.lower())
+                if hit:
+                    candidate_indices |= hit
         
         # 如果没有候选结果，使用向量检索的结果
         if not candidate_indices:
-            candidate_indices = set(indices[0][:search_k])
+            candidate_indices = set(indices_row[:search_k])
+
+        # 关键词独有候选：用 IDSelector 限定范围补查一次，
+        # 拿真实向量分数，代替人为的保底常数
+        keyword_only = [
+            int(i) for i in candidate_indices
+            if i not in idx_to_score and 0 <= i < n_chunks
+        ]
+        if keyword_only:
+            try:
+                sel = faiss.IDSelectorBatch(
+                    np.asarray(keyword_only, dtype=np.int64)
+                )
+                if hasattr(index, 'hnsw'):
+                    params = faiss.SearchParametersHNSW(sel=sel)
+                else:
+                    params = faiss.SearchParameters(sel=sel)
+                extra_d, extra_i = index.search(
+                    query_vec.reshape(1, -1), len(keyword_only), params=params
+                )
+                for i, d in zip(extra_i[0], extra_d[0]):
+                    if i >= 0:
+                        idx_to_score[int(i)] = float(d)
+            except (AttributeError, TypeError, RuntimeError):
+                # 旧版 faiss 不支持 IDSelector 搜索参数：沿用保底分数
+                pass
         
-        # 构建候选结果
-        candidate_results = []
-        for idx in candidate_indices:
-            if idx < 0 or idx >= len(metadata):
-                continue
-            
-            meta = metadata[idx].copy()
-            text = meta.get('text_preview', '')
-            
-            # 计算向量距离（如果在向量检索结果中）
-            vector_distance = None
-            if idx in indices[0]:
-                pos = list(indices[0]).index(idx)
-                vector_distance = float(distances[0][pos])
-            else:
-                # 如果不在向量检索结果中，使用一个较大的默认距离
-                vector_distance = 2.0
-            
-            # 计算关键词匹配分数
-            keyword_score = 0.0
-            keywords = []
-            if use_rerank and query_text:
+        # 候选打分：向量化内核，一次 C 级表达式算完全部候选
+        cand = np.fromiter(
+            (int(i) for i in candidate_indices if 0 <= i < n_chunks),
+            dtype=np.int64,
+        )
+        if cand.size == 0:
+            return []
+
+        fallback = -1.0 if higher_is_better else 2.0
+        vec_scores = np.fromiter(
+            (idx_to_score.get(int(i), fallback) for i in cand),
+            dtype=np.float32,
+            count=cand.size,
+        )
+
+        # 关键词匹配分数（token 集合求交，C 级集合操作）
+        kw_scores = np.zeros(cand.size, dtype=np.float32)
+        no_match_penalty = np.zeros(cand.size, dtype=np.float32)
+        if use_rerank and query_text:
+            keywords = _KW_RE.findall(query_text)
+            if keywords:
                 query_lower = query_text.lower()
-                text_lower = text.lower()
-                
-                # 提取关键词
-                import re
-                keywords = re.findall(r'[\u4e00-\u9fff]+|[a-zA-Z]+', query_text)
-                
-                if keywords:
-                    # 计算匹配的关键词数量
-                    matched_keywords = sum(1 for kw in keywords if kw.lower() in text_lower)
-                    total_keywords = len(keywords)
-                    
-                    # 按匹配比例给分（部分匹配也给予分数）
-                    if matched_keywords > 0:
-                        # 完全匹配所有关键词：3.0分
-                        # 匹配一半关键词：1.5分
-                        # 匹配部分关键词：按比例给分
-                        keyword_score = (matched_keywords / total_keywords) * 3.0
-                    
-                    # 检查完整查询文本匹配（更高权重）
-                    if query_lower in text_lower:
-                        keyword_score += 2.0
-            
-            # 综合分数
-            combined_score = vector_distance - keyword_score * 0.15
-            
-            # 如果没有任何关键词匹配，但有多个关键词，降低排名
-            if keyword_score == 0 and len(keywords) > 1:
-                combined_score += 0.3  # 增加距离，降低排名
-            
-            candidate_results.append({
-                'idx': idx,
-                'text': text,
-                'vector_score': vector_distance,
-                'keyword_score': keyword_score,
-                'combined_score': combined_score,
-                'meta': meta,
-            })
-        
-        # 按综合分数排序
-        candidate_results.sort(key=lambda x: x['combined_score'])
-        
-        # 构建最终结果
+                query_tokens = frozenset(kw.lower() for kw in keywords)
+                token_sets = cols['tokens']
+                matched = np.fromiter(
+                    (len(query_tokens & token_sets[i]) for i in cand),
+                    dtype=np.float32,
+                    count=cand.size,
+                )
+                # 按匹配比例给分：全部命中 3.0，部分命中按比例
+                kw_scores = matched * (3.0 / len(query_tokens))
+                # 完整查询文本命中：更高加权
+                full_hit = np.fromiter(
+                    (query_lower in texts_lower[i] for i in cand),
+                    dtype=bool,
+                    count=cand.size,
+                )
+                kw_scores[full_hit] += 2.0
+                # 多关键词但一个都没命中：增加距离，降低排名
+                if len(query_tokens) > 1:
+                    no_match_penalty[matched == 0] = 0.3
+
+        # 综合分数：统一按"越小越好"排序，内积相似度取负号
+        base_scores = -vec_scores if higher_is_better else vec_scores
+        combined = base_scores - kw_scores * 0.15 + no_match_penalty
+
+        # argpartition 选出 top_k 后只对 top_k 排序，避免全量排序
+        if combined.size > top_k:
+            top = np.argpartition(combined, top_k)[:top_k]
+        else:
+            top = np.arange(combined.size)
+        order = top[np.argsort(combined[top])]
+
+        # 构建最终结果：按下标从各列 gather
         results = []
-        for candidate in candidate_results[:top_k]:
+        for j in order:
+            idx = int(cand[j])
             results.append({
-                'text': candidate['text'],
-                'score': candidate['vector_score'],
-                'combined_score': candidate['combined_score'],
-                'keyword_matches': candidate['keyword_score'],
+                'text': previews[idx],
+                'score': float(vec_scores[j]),
+                'combined_score': float(combined[j]),
+                'keyword_matches': float(kw_scores[j]),
                 'metadata': {
-                    'chunk_id': candidate['meta'].get('chunk_id'),
-                    'file': candidate['meta'].get('file'),
-                    'heading': candidate['meta'].get('heading'),
-                    'text_preview': candidate['meta'].get('text_preview'),
-                    'entities_guess': candidate['meta'].get('entities_guess', []),
+                    'chunk_id': cols['chunk_id'][idx],
+                    'file': cols['file'][idx],
+                    'heading': cols['heading'][idx],
+                    'text_preview': previews[idx],
+                    'entities_guess': cols['entities_guess'][idx],
                 }
             })
-        
+
         return results
-        
-        # 构建结果
-        results = []
-        for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-            if idx < 0 or idx >= len(metadata):
-                continue
-            
-            meta = metadata[idx].copy()
-            
-            # 使用 text_preview 作为返回文本
-            text = meta.get('text_preview', '')
-            
-            # 计算关键词匹配分数（用于重排序）
-            keyword_score = 0.0
-            if use_rerank and query_text:
-                import re
-                query_lower = query_text.lower()
-                text_lower = text.lower()
-                
-                # 提取中文词汇（连续的中文字符）
-                chinese_words = re.findall(r'[\u4e00-\u9fff]+', query_text)
-                for word in chinese_words:
-                    if len(word) >= 2:  # 至少2个字符的词汇
-                        if word in text:
-                            keyword_score += 2.0  # 完整词汇匹配，更高权重
-                        elif len(word) > 2:
-                            # 对于长词，也检查部分匹配
-                            for i in range(len(word) - 1):
-                                subword = word[i:i+2]
-                                if subword in text:
-                                    keyword_score += 0.5
-                                    break
-                
-                # 检查英文单词匹配
-                english_words = re.findall(r'[a-zA-Z]+', query_text)
-                for word in english_words:
-                    if len(word) > 2 and word.lower() in text_lower:
-                        keyword_score += 1.0
-            
-            # 综合分数：距离越小越好，关键词匹配越多越好
-            # 将距离转换为相似度分数（距离越小，相似度越高）
-            # 然后结合关键词匹配
-            combined_score = distance - keyword_score * 0.1  # 关键词匹配可以降低分数
-            
-            results.append({
-                'text': text,
-                'score': float(distance),  # 原始 L2 距离
-                'combined_score': float(combined_score),  # 综合分数
-                'keyword_matches': keyword_score,  # 关键词匹配数
-                'metadata': {
-                    'chunk_id': meta.get('chunk_id'),
-                    'file': meta.get('file'),
-                    'heading': meta.get('heading'),
-                    'text_preview': meta.get('text_preview'),
-                    'entities_guess': meta.get('entities_guess', []),
-                }
-            })
-        
-        # 如果使用重排序，按综合分数排序
-        if use_rerank:
-            results.sort(key=lambda x: x['combined_score'])
-        
-        # 只返回 top_k 个结果
-        return results[:top_k]
-    
+
     def clear_cache(self, story_id: Optional[str] = None):
         """
         清除缓存
@@ -353,9 +794,19 @@ class RAGService:
         if story_id:
             self._index_cache.pop(story_id, None)
             self._meta_cache.pop(story_id, None)
+            self._inverted_cache.pop(story_id, None)
+            self._meta_cols.pop(story_id, None)
+            self._query_cache.pop(story_id, None)
+            # 同时删掉磁盘侧车，否则下次加载又会把旧结果读回来
+            self._get_qcache_path(story_id).unlink(missing_ok=True)
         else:
             self._index_cache.clear()
             self._meta_cache.clear()
+            self._inverted_cache.clear()
+            self._meta_cols.clear()
+            self._query_cache.clear()
+            for qcache_path in self.index_base_dir.glob("*_world_bible.qcache.pkl"):
+                qcache_path.unlink(missing_ok=True)
 
 
 # 全局单例（可选）
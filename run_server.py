@@ -1,6 +1,14 @@
 """
 启动 FastAPI 服务（推荐方式）
+
+默认按生产配置启动：多 worker + uvloop + httptools。
+开发时设置 DEV=1 启用自动重载（单进程、文件监控）。
+
+环境变量：
+    DEV=1       开发模式，启用 reload
+    WORKERS=N   worker 进程数（默认 CPU 核数；DEV 模式下忽略）
 """
+import os
 import sys
 from pathlib import Path
 
@@ -12,12 +20,20 @@ if str(project_root) not in sys.path:
 import uvicorn
 
 if __name__ == "__main__":
-    # 使用导入字符串以支持 reload 功能
+    reload = os.getenv("DEV") == "1"
+    if not reload:
+        # 多 worker 下限制每进程的 OpenMP 线程数，
+        # 避免 FAISS 各 worker 争抢全部核心导致超额订阅
+        os.environ.setdefault("OMP_NUM_THREADS", "1")
+    # 使用导入字符串以支持 reload / 多 worker
     uvicorn.run(
         "backend.api.routes:app",  # 导入字符串格式
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=reload,
+        # reload 与多 worker 互斥：开发模式保持单进程
+        workers=None if reload else int(os.getenv("WORKERS", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools",
         log_level="info",
     )
-
@@ -0,0 +1,36 @@
+"""
+测试脚本共享的后台输出线程
+
+事件循环里的 print 是同步 write，并发 LLM 调用间穿插大量打印时
+会阻塞 loop。log() 只把字符串投进队列（微秒级），由后台守护线程
+统一写 stdout；退出前调用 flush_logs() 确保队列排空。
+"""
+import queue
+import sys
+import threading
+
+_Q: queue.Queue = queue.Queue()
+
+
+def _drain():
+    while True:
+        msg = _Q.get()
+        try:
+            sys.stdout.write(msg)
+        finally:
+            _Q.task_done()
+
+
+_worker = threading.Thread(target=_drain, daemon=True)
+_worker.start()
+
+
+def log(msg: str = ""):
+    """异步安全的打印：只入队，不在调用方线程写 stdout"""
+    _Q.put(f"{msg}\n")
+
+
+def flush_logs():
+    """等待队列排空并刷新 stdout（进程退出前调用）"""
+    _Q.join()
+    sys.stdout.flush()
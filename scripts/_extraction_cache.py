@@ -0,0 +1,63 @@
+"""
+测试脚本用的 LLM 抽取结果磁盘缓存
+
+三个测试脚本里"玩家向曹操打招呼"等场景的输入完全相同，
+没必要每次运行都重新打一遍 LLM。按 (状态, 消息, 草稿, 轮次)
+的 SHA256 做键，把 ExtractionResult 以 pickle 存盘，
+第二次及以后的运行直接命中缓存（秒级 → 微秒级）。
+
+仅测试脚本使用，设置 LLM_CACHE=0 可关闭。
+缓存目录 scripts/.llm_cache/ 已加入 .gitignore。
+"""
+import functools
+import hashlib
+import json
+import pickle
+from pathlib import Path
+
+_CACHE_DIR = Path(__file__).parent / ".llm_cache"
+
+
+def _cache_key(canonical_state, user_message: str, assistant_draft: str, turn: int) -> str:
+    """计算缓存键
+
+    排除 meta.updated_at：它是每次构造都变的时间戳，
+    计入的话缓存永远不会命中。
+    """
+    state_dump = canonical_state.model_dump(exclude={"meta": {"updated_at"}})
+    raw = json.dumps(
+        [state_dump, user_message, assistant_draft, turn],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cached_extract(fn):
+    """包装 EventExtractor.extract_events（绑定方法），加磁盘缓存"""
+
+    @functools.wraps(fn)
+    async def wrap(canonical_state, user_message, assistant_draft, turn):
+        key = _cache_key(canonical_state, user_message, assistant_draft, turn)
+        cache_file = _CACHE_DIR / f"{key}.pkl"
+        if cache_file.exists():
+            try:
+                with open(cache_file, "rb") as f:
+                    return pickle.load(f)
+            except Exception:
+                pass  # 缓存文件损坏则回源重新抽取
+
+        result = await fn(
+            canonical_state=canonical_state,
+            user_message=user_message,
+            assistant_draft=assistant_draft,
+            turn=turn,
+        )
+
+        _CACHE_DIR.mkdir(exist_ok=True)
+        with open(cache_file, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return result
+
+    return wrap
@@ -0,0 +1,56 @@
+"""
+Extractor 测试脚本共享的 EventExtractor 单例
+
+同一进程内复用一个实例（及其底层 HTTP 连接池），
+多个场景间可以复用 keep-alive 连接，省去每次的冷启动开销。
+"""
+import functools
+import os
+import sys
+from pathlib import Path
+
+import httpx
+
+# 添加 backend 到路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path.parent))
+
+from backend.extractor import EventExtractor
+from _extraction_cache import cached_extract
+
+
+def _make_http_client():
+    """HTTPX_AIOHTTP=1 时换用 aiohttp 传输层（高并发 POST 下吞吐更好）
+
+    需要额外安装 httpx-aiohttp 与 aiohttp，缺失时回退到默认传输层。
+    返回 None 表示让 OpenAI SDK 用自带客户端。
+    """
+    if os.getenv("HTTPX_AIOHTTP") != "1":
+        return None
+    try:
+        import aiohttp
+        from httpx_aiohttp import AiohttpTransport
+    except ImportError:
+        print("⚠️  未安装 httpx-aiohttp/aiohttp，使用默认 httpx 传输层")
+        return None
+    session = aiohttp.ClientSession()
+    return httpx.AsyncClient(transport=AiohttpTransport(client=session))
+
+
+@functools.lru_cache(maxsize=1)
+def get_extractor() -> EventExtractor:
+    """返回进程级共享的 EventExtractor（只构造一次）
+
+    默认给 extract_events 套上磁盘缓存（仅此测试单例，不影响生产代码），
+    重复运行相同场景时跳过 LLM 调用；LLM_CACHE=0 关闭。
+    """
+    extractor = EventExtractor(http_client=_make_http_client())
+    if os.getenv("LLM_CACHE") != "0":
+        extractor.extract_events = cached_extract(extractor.extract_events)
+    return extractor
+
+
+async def aclose_extractor():
+    """关闭已缓存实例的底层 HTTP 连接（进程退出前调用）"""
+    if get_extractor.cache_info().currsize:
+        await get_extractor().client.close()
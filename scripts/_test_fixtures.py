@@ -0,0 +1,91 @@
+"""
+Extractor 测试脚本共享的测试状态工厂
+
+模板状态只构建（并通过 Pydantic 完整校验）一次，
+各脚本按需拿深拷贝，互不干扰。
+"""
+import functools
+import os
+import sys
+from pathlib import Path
+
+# 添加 backend 到路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path.parent))
+
+from backend.models import (
+    CanonicalState,
+    MetaInfo,
+    TimeState,
+    TimeAnchor,
+    PlayerState,
+    Entities,
+    Character,
+    Location,
+    QuestState,
+    Constraints,
+)
+
+
+# 预验证的 JSON 快照：pydantic-core 直接解析 JSON 字节
+# 比逐字段走 Python 构造器快；模型变更后设 REGEN_TEST_STATE=1 重建
+_SNAPSHOT = Path(__file__).parent / "_test_state.json"
+
+
+def _build_template() -> CanonicalState:
+    """用构造器搭建测试状态模板（仅在快照缺失/重建时走这条路）"""
+    # 创建地点
+    luoyang = Location(id="luoyang", name="洛阳")
+    xuchang = Location(id="xuchang", name="许昌")
+
+    # 创建角色
+    caocao = Character(
+        id="caocao",
+        name="曹操",
+        location_id="luoyang",
+        alive=True,
+    )
+
+    liubei = Character(
+        id="liubei",
+        name="刘备",
+        location_id="xuchang",
+        alive=True,
+    )
+
+    return CanonicalState(
+        meta=MetaInfo(story_id="sanguo_test", turn=0),
+        time=TimeState(
+            calendar="建安三年春",
+            anchor=TimeAnchor(label="建安三年春", order=10)
+        ),
+        player=PlayerState(
+            id="player_001",
+            name="玩家",
+            location_id="luoyang",
+            inventory=[],
+            party=[],
+        ),
+        entities=Entities(
+            characters={"caocao": caocao, "liubei": liubei},
+            items={},
+            locations={"luoyang": luoyang, "xuchang": xuchang},
+        ),
+        quest=QuestState(),
+        constraints=Constraints(),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _template() -> CanonicalState:
+    """加载测试状态模板（只构建/校验一次）"""
+    if os.getenv("REGEN_TEST_STATE") != "1" and _SNAPSHOT.exists():
+        return CanonicalState.model_validate_json(_SNAPSHOT.read_bytes())
+    state = _build_template()
+    _SNAPSHOT.write_bytes(state.model_dump_json(indent=2).encode("utf-8"))
+    return state
+
+
+def make_test_state() -> CanonicalState:
+    """返回测试状态（模板的深拷贝，可随意修改）"""
+    return _template().model_copy(deep=True)
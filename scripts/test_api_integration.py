@@ -4,180 +4,256 @@ API 集成测试（使用 HTTP 请求）
 import asyncio
 import httpx
 import json
+import sys
+import time
 from pathlib import Path
 
+from _console import log, flush_logs
 
-async def test_api_integration():
+# 横幅字符串在导入时构建一次，避免每次打印重复拼接
+BAR = "=" * 70
+
+
+def print_section(title: str):
+    """打印阶段标题（整个横幅作为一条消息入队）"""
+    log(f"\n{BAR}\n{title}\n{BAR}")
+
+# HTTP/2 需要可选依赖 h2（pip install httpx[http2]）。
+# 本地 uvicorn 只讲 HTTP/1.1，但经支持 HTTP/2 的反代压测时，
+# 并发请求可在单条连接上多路复用，省去逐请求建连
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+# 模块级共享客户端：四个测试阶段复用同一连接池，
+# 避免每阶段重复 TCP 握手；退出前在 main 中统一关闭
+_CLIENT = httpx.AsyncClient(
+    base_url="http://localhost:8000",
+    timeout=30.0,
+    http2=_HTTP2,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+)
+
+
+async def test_api_integration(client: httpx.AsyncClient = _CLIENT):
     """测试 API 集成"""
-    print("=" * 70)
-    print("🌐 API 集成测试（HTTP 请求）")
-    print("=" * 70)
-    
-    base_url = "http://localhost:8000"
+    print_section("🌐 API 集成测试（HTTP 请求）")
+
     story_id = "sanguo_api_test"
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # ==================== 测试 1: 获取状态 ====================
-        print(f"\n{'='*70}")
-        print("测试 1: GET /state/{story_id}")
-        print(f"{'='*70}")
-        
+
+    # ==================== 测试 1: 获取状态 + RAG 预查询 ====================
+    print_section("测试 1: GET /state/{story_id}")
+
+    # 状态 GET 与 RAG 查询互不依赖：并发发出，RAG 结果在测试 3 打印
+    try:
+        state_response, rag_response = await asyncio.gather(
+            client.get(f"/state/{story_id}"),
+            client.post(
+                "/rag/query",
+                json={
+                    "story_id": story_id,
+                    "query": "曹操的武器是什么？",
+                    "top_k": 5,
+                },
+            ),
+            return_exceptions=True,
+        )
+        if isinstance(state_response, Exception):
+            raise state_response
+
+        response = state_response
+        log(f"   状态码: {response.status_code}")
+
+        # 记下 ETag 与本次结果：测试 4 用条件 GET 复查状态，
+        # 服务端支持时未变更只回 304，省掉重新下载和解析
+        etag = response.headers.get("etag")
+        initial_state = None
+
+        if response.status_code == 200:
+            data = response.json()
+            initial_state = data
+            log(f"   ✅ 成功获取状态")
+            log(f"   - Story ID: {data['meta']['story_id']}")
+            log(f"   - Turn: {data['meta']['turn']}")
+            log(f"   - 玩家位置: {data['player']['location_id']}")
+        else:
+            log(f"   ❌ 错误: {response.text}")
+    except Exception as e:
+        log(f"   ❌ 请求失败: {e}")
+        return
+
+    # ==================== 测试 2: 处理草稿 ====================
+    print_section("测试 2: POST /draft/process")
+
+    test_cases = [
+        {
+            "name": "简单对话",
+            "user_message": "玩家向曹操打招呼",
+            "assistant_draft": "玩家向曹操打招呼，曹操点头回应。",
+        },
+        {
+            "name": "物品获得",
+            "user_message": "玩家在地上发现了一把剑",
+            "assistant_draft": "玩家在地上发现了一把青釭剑，将其拾起放入背包。",
+        },
+        {
+            "name": "角色移动",
+            "user_message": "玩家决定前往许昌",
+            "assistant_draft": "玩家离开洛阳，经过长途跋涉，终于到达了许昌。",
+        },
+    ]
+
+    # 并发发出全部草稿请求：总耗时从各请求之和降为最慢的一个，
+    # httpx 在同一个连接池上复用连接
+    async def _post_draft(test_case):
+        """单请求 60 秒超时；异常作为结果收集，避免 TaskGroup 取消兄弟任务"""
         try:
-            response = await client.get(f"{base_url}/state/{story_id}")
-            print(f"   状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"   ✅ 成功获取状态")
-                print(f"   - Story ID: {data['meta']['story_id']}")
-                print(f"   - Turn: {data['meta']['turn']}")
-                print(f"   - 玩家位置: {data['player']['location_id']}")
-            else:
-                print(f"   ❌ 错误: {response.text}")
-        except Exception as e:
-            print(f"   ❌ 请求失败: {e}")
-            return
-        
-        # ==================== 测试 2: 处理草稿 ====================
-        print(f"\n{'='*70}")
-        print("测试 2: POST /draft/process")
-        print(f"{'='*70}")
-        
-        test_cases = [
-            {
-                "name": "简单对话",
-                "user_message": "玩家向曹操打招呼",
-                "assistant_draft": "玩家向曹操打招呼，曹操点头回应。",
-            },
-            {
-                "name": "物品获得",
-                "user_message": "玩家在地上发现了一把剑",
-                "assistant_draft": "玩家在地上发现了一把青釭剑，将其拾起放入背包。",
-            },
-            {
-                "name": "角色移动",
-                "user_message": "玩家决定前往许昌",
-                "assistant_draft": "玩家离开洛阳，经过长途跋涉，终于到达了许昌。",
-            },
-        ]
-        
-        for i, test_case in enumerate(test_cases, 1):
-            print(f"\n   📋 测试用例 {i}: {test_case['name']}")
-            print(f"   用户消息: {test_case['user_message']}")
-            print(f"   助手草稿: {test_case['assistant_draft']}")
-            
-            try:
-                response = await client.post(
-                    f"{base_url}/draft/process",
+            async with asyncio.timeout(60):  # 给 LLM 调用更多时间
+                return await client.post(
+                    "/draft/process",
                     json={
                         "story_id": story_id,
                         "user_message": test_case["user_message"],
                         "assistant_draft": test_case["assistant_draft"],
                     },
-                    timeout=60.0,  # 给 LLM 调用更多时间
                 )
-                
-                print(f"   状态码: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"   ✅ 处理成功")
-                    print(f"   - 最终动作: {data['final_action']}")
-                    
-                    if data.get("state"):
-                        print(f"   - 新 Turn: {data['state']['meta']['turn']}")
-                        print(f"   - 玩家位置: {data['state']['player']['location_id']}")
-                        if data['state']['player']['inventory']:
-                            print(f"   - 玩家库存: {data['state']['player']['inventory']}")
-                    
-                    if data.get("recent_events"):
-                        print(f"   - 最近事件: {len(data['recent_events'])} 个")
-                        for event in data['recent_events'][:3]:
-                            print(f"     * [{event['type']}] {event['summary']}")
-                    
-                    if data.get("questions"):
-                        print(f"   - 需要澄清: {len(data['questions'])} 个问题")
-                        for q in data['questions']:
-                            print(f"     * {q}")
-                    
-                    if data.get("rewrite_instructions"):
-                        print(f"   - 重写指令: {data['rewrite_instructions'][:100]}...")
-                    
-                    if data.get("violations"):
-                        print(f"   - 违反规则: {len(data['violations'])} 个")
-                        for v in data['violations'][:3]:
-                            print(f"     * {v.get('rule_id', 'Unknown')}: {v.get('message', '')[:50]}...")
-                else:
-                    print(f"   ❌ 错误: {response.status_code}")
-                    print(f"   {response.text[:200]}")
-                    
-            except httpx.TimeoutException:
-                print(f"   ⚠️  请求超时（LLM 调用可能需要更长时间）")
-            except Exception as e:
-                print(f"   ❌ 请求失败: {e}")
-        
-        # ==================== 测试 3: RAG 查询 ====================
-        print(f"\n{'='*70}")
-        print("测试 3: POST /rag/query")
-        print(f"{'='*70}")
-        
-        try:
-            response = await client.post(
-                f"{base_url}/rag/query",
-                json={
-                    "story_id": story_id,
-                    "query": "曹操的武器是什么？",
-                    "top_k": 5,
-                },
-            )
-            
-            print(f"   状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"   ✅ 查询成功")
-                print(f"   - 查询: {data['query']}")
-                print(f"   - 结果数量: {len(data['results'])}")
-            else:
-                print(f"   ❌ 错误: {response.text}")
         except Exception as e:
-            print(f"   ❌ 请求失败: {e}")
-        
-        # ==================== 测试 4: 查看最终状态 ====================
-        print(f"\n{'='*70}")
-        print("测试 4: 查看最终状态")
-        print(f"{'='*70}")
-        
+            return e
+
+    # TaskGroup 保证结构化并发：离开 with 时所有任务都已结束
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(_post_draft(test_case)) for test_case in test_cases]
+    responses = [task.result() for task in tasks]
+
+    for i, (test_case, response) in enumerate(zip(test_cases, responses), 1):
+        log(f"\n   📋 测试用例 {i}: {test_case['name']}")
+        log(f"   用户消息: {test_case['user_message']}")
+        log(f"   助手草稿: {test_case['assistant_draft']}")
+
+        if isinstance(response, (httpx.TimeoutException, TimeoutError)):
+            log(f"   ⚠️  请求超时（LLM 调用可能需要更长时间）")
+            continue
+        if isinstance(response, Exception):
+            log(f"   ❌ 请求失败: {response}")
+            continue
+
+        log(f"   状态码: {response.status_code}")
+
+        if response.status_code == 200:
+            data = response.json()
+            log(f"   ✅ 处理成功")
+            log(f"   - 最终动作: {data['final_action']}")
+
+            if data.get("state"):
+                log(f"   - 新 Turn: {data['state']['meta']['turn']}")
+                log(f"   - 玩家位置: {data['state']['player']['location_id']}")
+                if data['state']['player']['inventory']:
+                    log(f"   - 玩家库存: {data['state']['player']['inventory']}")
+
+            if data.get("recent_events"):
+                log(f"   - 最近事件: {len(data['recent_events'])} 个")
+                for event in data['recent_events'][:3]:
+                    log(f"     * [{event['type']}] {event['summary']}")
+
+            if data.get("questions"):
+                log(f"   - 需要澄清: {len(data['questions'])} 个问题")
+                for q in data['questions']:
+                    log(f"     * {q}")
+
+            if data.get("rewrite_instructions"):
+                log(f"   - 重写指令: {data['rewrite_instructions'][:100]}...")
+
+            if data.get("violations"):
+                log(f"   - 违反规则: {len(data['violations'])} 个")
+                for v in data['violations'][:3]:
+                    log(f"     * {v.get('rule_id', 'Unknown')}: {v.get('message', '')[:50]}...")
+        else:
+            log(f"   ❌ 错误: {response.status_code}")
+            log(f"   {response.text[:200]}")
+
+    # ==================== 测试 3: RAG 查询 ====================
+    print_section("测试 3: POST /rag/query")
+
+    # 结果来自测试 1 阶段并发发出的查询
+    if isinstance(rag_response, Exception):
+        log(f"   ❌ 请求失败: {rag_response}")
+    else:
+        log(f"   状态码: {rag_response.status_code}")
+
+        if rag_response.status_code == 200:
+            data = rag_response.json()
+            log(f"   ✅ 查询成功")
+            log(f"   - 查询: {data['query']}")
+            log(f"   - 结果数量: {len(data['results'])}")
+        else:
+            log(f"   ❌ 错误: {rag_response.text}")
+
+    # ==================== 测试 4: 查看最终状态 ====================
+    print_section("测试 4: 查看最终状态")
+
+    try:
+        response = await client.get(
+            f"/state/{story_id}",
+            headers={"If-None-Match": etag} if etag else None,
+        )
+        if response.status_code == 304:
+            # 状态未变更：复用测试 1 解析好的结果，跳过重新解析
+            log(f"   ✅ 状态未变更（304），复用测试 1 的结果")
+            data = initial_state
+        elif response.status_code == 200:
+            data = response.json()
+        else:
+            data = None
+        if data is not None:
+            log(f"   ✅ 最终状态:")
+            log(f"   - Turn: {data['meta']['turn']}")
+            log(f"   - 最后事件: {data['meta']['last_event_id']}")
+            log(f"   - 玩家位置: {data['player']['location_id']}")
+            log(f"   - 玩家库存: {data['player']['inventory']}")
+            log(f"   - 角色数量: {len(data['entities']['characters'])}")
+            log(f"   - 物品数量: {len(data['entities']['items'])}")
+    except Exception as e:
+        log(f"   ❌ 请求失败: {e}")
+
+    # ==================== 总结 ====================
+    print_section("✅ API 集成测试完成！")
+    log(f"\n💡 提示:")
+    log(f"   - 访问 http://localhost:8000/ 查看测试页面")
+    log(f"   - 访问 http://localhost:8000/docs 查看 Swagger UI")
+
+
+async def wait_ready(client: httpx.AsyncClient, deadline: float = 10.0):
+    """主动探测服务器就绪，替代固定等待
+
+    服务器已经在跑时立即返回（省下固定 sleep），
+    否则每 0.1 秒重试，超过 deadline 秒报错快速失败。
+    """
+    start = time.monotonic()
+    while time.monotonic() - start < deadline:
         try:
-            response = await client.get(f"{base_url}/state/{story_id}")
-            if response.status_code == 200:
-                data = response.json()
-                print(f"   ✅ 最终状态:")
-                print(f"   - Turn: {data['meta']['turn']}")
-                print(f"   - 最后事件: {data['meta']['last_event_id']}")
-                print(f"   - 玩家位置: {data['player']['location_id']}")
-                print(f"   - 玩家库存: {data['player']['inventory']}")
-                print(f"   - 角色数量: {len(data['entities']['characters'])}")
-                print(f"   - 物品数量: {len(data['entities']['items'])}")
-        except Exception as e:
-            print(f"   ❌ 请求失败: {e}")
-        
-        # ==================== 总结 ====================
-        print(f"\n{'='*70}")
-        print("✅ API 集成测试完成！")
-        print(f"{'='*70}")
-        print(f"\n💡 提示:")
-        print(f"   - 访问 http://localhost:8000/ 查看测试页面")
-        print(f"   - 访问 http://localhost:8000/docs 查看 Swagger UI")
+            response = await client.get("/", timeout=0.5)
+            if response.status_code < 500:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f"服务器在 {deadline} 秒内未就绪，请先运行 python run_server.py")
+
+
+async def main():
+    """运行集成测试并确保客户端连接池正确关闭"""
+    try:
+        await wait_ready(_CLIENT)
+        await test_api_integration()
+    finally:
+        await _CLIENT.aclose()
 
 
 if __name__ == "__main__":
-    print("\n⚠️  请确保 API 服务器正在运行:")
-    print("   python run_server.py")
-    print("\n等待 3 秒后开始测试...\n")
-    
-    import time
-    time.sleep(3)
-    
-    asyncio.run(test_api_integration())
+    log("\n⚠️  请确保 API 服务器正在运行:")
+    log("   python run_server.py\n")
 
+    asyncio.run(main())
+    flush_logs()
@@ -3,94 +3,121 @@
 完整测试角色死亡场景：袁绍被何进处死
 包括先创建必要的角色和地点
 """
+import asyncio
 import json
-import urllib.request
-import urllib.error
+import sys
 from typing import Dict, Any, Optional
 
+import httpx
+
+from _console import log, flush_logs
+
+# 大状态负载下 orjson 解析快数倍；未安装时回退到标准库
+try:
+    import orjson
+
+    def _loads(raw: bytes) -> Dict:
+        return orjson.loads(raw)
+
+    def _dumps(data: Dict) -> bytes:
+        return orjson.dumps(data)
+
+except ImportError:  # pragma: no cover
+    def _loads(raw: bytes) -> Dict:
+        return json.loads(raw)
+
+    def _dumps(data: Dict) -> bytes:
+        return json.dumps(data).encode("utf-8")
+
 
 BASE_URL = "http://127.0.0.1:8000"
 STORY_ID = "sanguo_test_baihua"
 
 
-def make_request(url: str, method: str = "GET", data: Optional[Dict] = None, timeout: int = 60) -> tuple[int, Dict]:
-    """发送HTTP请求"""
+async def make_request(
+    client: httpx.AsyncClient,
+    url: str,
+    method: str = "GET",
+    data: Optional[Dict] = None,
+    timeout: int = 60,
+) -> tuple[int, Dict]:
+    """发送HTTP请求（三个测试步骤共享同一连接池，复用 keep-alive 连接）"""
     try:
-        if data:
-            req_data = json.dumps(data).encode('utf-8')
-            request = urllib.request.Request(
-                url,
-                data=req_data,
-                headers={'Content-Type': 'application/json'},
-                method=method
-            )
-        else:
-            request = urllib.request.Request(url, method=method)
-        
-        with urllib.request.urlopen(request, timeout=timeout) as response:
-            status = response.getcode()
-            body = response.read().decode('utf-8')
-            try:
-                json_data = json.loads(body) if body else {}
-            except:
-                json_data = {}
-            return status, json_data
-    except urllib.error.HTTPError as e:
-        body = e.read().decode('utf-8') if e.fp else ''
-        try:
-            json_data = json.loads(body) if body else {}
-        except:
-            json_data = {}
-        return e.code, json_data
+        # 请求体用 orjson 直接序列化为 bytes，跳过 str -> bytes 的拷贝
+        response = await client.request(
+            method,
+            url,
+            content=_dumps(data) if data is not None else None,
+            headers={"Content-Type": "application/json"} if data is not None else None,
+            timeout=timeout,
+        )
     except Exception as e:
-        print(f"   请求失败: {e}")
+        log(f"   请求失败: {e}")
         return 0, {}
 
+    try:
+        json_data = _loads(response.content) if response.content else {}
+    except ValueError:
+        json_data = {}
+    return response.status_code, json_data
+
+
+# 横幅字符串在导入时构建一次，避免每次打印重复拼接
+BAR = "=" * 70
+
 
 def print_section(title: str):
-    """打印章节标题"""
-    print(f"\n{'='*70}")
-    print(title)
-    print(f"{'='*70}")
+    """打印章节标题（整个横幅作为一条消息入队）"""
+    log(f"\n{BAR}\n{title}\n{BAR}")
 
 
 def print_success(msg: str):
     """打印成功消息"""
-    print(f"   ✅ {msg}")
+    log(f"   ✅ {msg}")
 
 
 def print_error(msg: str):
     """打印错误消息"""
-    print(f"   ❌ {msg}")
+    log(f"   ❌ {msg}")
 
 
 def print_info(msg: str):
     """打印信息消息"""
-    print(f"   ℹ️  {msg}")
+    log(f"   ℹ️  {msg}")
 
 
-def setup_characters() -> bool:
-    """步骤1: 创建必要的角色和地点"""
-    print_section("步骤 1: 创建必要的角色和地点")
-    
-    # 先创建一个场景，让系统创建角色
-    user_message = "何进和袁绍在洛阳的皇宫中会面"
-    assistant_draft = "何进和袁绍在洛阳的皇宫中会面。何进是大将军，袁绍是司隶校尉。两人讨论朝政大事。"
-    
-    print_info(f"用户消息: {user_message}")
-    print_info(f"助手草稿: {assistant_draft}")
-    print("")
-    
-    url = f"{BASE_URL}/draft/process"
+# 步骤 1/2 的两条草稿：一次 POST /draft/process_batch 送出，
+# 服务端按顺序处理，省掉一次完整的 HTTP 往返
+SETUP_DRAFT = {
+    "user_message": "何进和袁绍在洛阳的皇宫中会面",
+    "assistant_draft": "何进和袁绍在洛阳的皇宫中会面。何进是大将军，袁绍是司隶校尉。两人讨论朝政大事。",
+}
+DEATH_DRAFT = {
+    "user_message": "何进下令处死袁绍",
+    "assistant_draft": "何进（hejin）下令处死袁绍（yuanshao）。士兵们将袁绍押到洛阳的刑场，执行了死刑。袁绍倒在地上，再也没有起来。",
+}
+
+
+async def run_draft_batch(client: httpx.AsyncClient) -> tuple:
+    """批量提交步骤 1/2 的草稿，返回 (status, [result, ...])"""
+    url = f"{BASE_URL}/draft/process_batch"
     data = {
         "story_id": STORY_ID,
-        "user_message": user_message,
-        "assistant_draft": assistant_draft
+        "drafts": [SETUP_DRAFT, DEATH_DRAFT],
     }
+    status, batch = await make_request(client, url, method="POST", data=data, timeout=180)
+    return status, batch.get('results', []) if status == 200 else []
+
+
+def check_setup_result(status: int, result: Dict) -> bool:
+    """步骤1: 创建必要的角色和地点"""
+    print_section("步骤 1: 创建必要的角色和地点")
     
-    status, result = make_request(url, method="POST", data=data, timeout=90)
+    print_info(f"用户消息: {SETUP_DRAFT['user_message']}")
+    print_info(f"助手草稿: {SETUP_DRAFT['assistant_draft']}")
+    log("")
     
-    if status == 200:
+    if status == 200 and result:
         final_action = result.get('final_action', '')
         print_success(f"场景创建成功 (动作: {final_action})")
         
@@ -117,50 +144,40 @@ def setup_characters() -> bool:
         return False
 
 
-def test_death_scenario() -> bool:
+def check_death_result(status: int, result: Dict) -> bool:
     """步骤2: 测试死亡场景"""
     print_section("步骤 2: 测试死亡场景 - 袁绍被何进处死")
     
-    # 使用更明确的描述，包含角色ID和地点
-    user_message = "何进下令处死袁绍"
-    assistant_draft = "何进（hejin）下令处死袁绍（yuanshao）。士兵们将袁绍押到洛阳的刑场，执行了死刑。袁绍倒在地上，再也没有起来。"
-    
-    print_info(f"用户消息: {user_message}")
-    print_info(f"助手草稿: {assistant_draft}")
-    print("")
-    
-    url = f"{BASE_URL}/draft/process"
-    data = {
-        "story_id": STORY_ID,
-        "user_message": user_message,
-        "assistant_draft": assistant_draft
-    }
-    
-    status, result = make_request(url, method="POST", data=data, timeout=90)
+    print_info(f"用户消息: {DEATH_DRAFT['user_message']}")
+    print_info(f"助手草稿: {DEATH_DRAFT['assistant_draft']}")
+    log("")
     
-    if status == 200:
+    if status == 200 and result:
         final_action = result.get('final_action', '')
         print_success(f"草稿处理完成 (动作: {final_action})")
-        print("")
+        log("")
         
         # 检查事件
         recent_events = result.get('recent_events', [])
         if recent_events:
             print_info(f"提取了 {len(recent_events)} 个事件:")
             death_events = []
+            # 事件列表拼成一个字符串、一次 print，减少逐行 write 的系统调用
+            lines = []
             for i, event in enumerate(recent_events, 1):
                 event_type = event.get('type', 'UNKNOWN')
                 summary = event.get('summary', 'N/A')
                 actors = event.get('who', {}).get('actors', [])
-                print(f"   {i}. [{event_type}] {summary}")
-                print(f"      参与者: {', '.join(actors)}")
+                lines.append(f"   {i}. [{event_type}] {summary}")
+                lines.append(f"      参与者: {', '.join(actors)}")
                 
                 # 检查是否是死亡事件
                 if event_type == 'DEATH':
                     death_events.append(event)
                     payload = event.get('payload', {})
                     char_id = payload.get('character_id', 'N/A')
-                    print(f"      ✅ 检测到死亡事件: {char_id}")
+                    lines.append(f"      ✅ 检测到死亡事件: {char_id}")
+            log("\n".join(lines))
             
             if not death_events:
                 print_error("未检测到 DEATH 类型事件")
@@ -168,7 +185,7 @@ def test_death_scenario() -> bool:
         # 检查状态更新
         updated_state = result.get('state')
         if updated_state:
-            print("")
+            log("")
             print_info("状态更新:")
             characters = updated_state.get('entities', {}).get('characters', {})
             
@@ -193,43 +210,43 @@ def test_death_scenario() -> bool:
         # 检查是否有违反规则
         violations = result.get('violations', [])
         if violations:
-            print("")
+            log("")
             print_error(f"检测到 {len(violations)} 个规则违反:")
             for v in violations:
                 rule_id = v.get('rule_id', 'Unknown')
                 message = v.get('message', 'N/A')
-                print(f"   - {rule_id}: {message}")
+                log(f"   - {rule_id}: {message}")
         else:
-            print("")
+            log("")
             print_success("无规则违反 ✅")
         
         # 检查是否需要重写或澄清
         if final_action == 'REWRITE':
             rewrite_instructions = result.get('rewrite_instructions', '')
-            print("")
+            log("")
             print_info(f"需要重写: {rewrite_instructions[:200]}")
         elif final_action == 'ASK_USER':
             questions = result.get('questions', [])
-            print("")
+            log("")
             print_info(f"需要用户澄清: {len(questions)} 个问题")
             for q in questions:
-                print(f"   - {q}")
+                log(f"   - {q}")
         
         # 如果返回 ASK_USER，也算部分成功（说明系统正确识别了需要澄清的问题）
         return final_action in ['PASS', 'AUTO_FIX', 'ASK_USER']
     else:
         print_error(f"草稿处理失败 (状态码: {status})")
         if result:
-            print(f"   响应: {json.dumps(result, indent=2, ensure_ascii=False)[:500]}")
+            log(f"   响应: {json.dumps(result, indent=2, ensure_ascii=False)[:500]}")
         return False
 
 
-def verify_death_state() -> bool:
+async def verify_death_state(client: httpx.AsyncClient) -> bool:
     """步骤3: 验证死亡后的状态"""
     print_section("步骤 3: 验证死亡后的状态")
     
     url = f"{BASE_URL}/state/{STORY_ID}"
-    status, data = make_request(url)
+    status, data = await make_request(client, url)
     
     if status == 200:
         characters = data.get('entities', {}).get('characters', {})
@@ -251,28 +268,35 @@ def verify_death_state() -> bool:
         return False
 
 
-def main():
+async def main():
     """主测试函数"""
-    print("="*70)
-    print("角色死亡场景完整测试：袁绍被何进处死")
-    print("="*70)
-    print(f"后端 URL: {BASE_URL}")
-    print(f"Story ID: {STORY_ID}")
+    log("="*70)
+    log("角色死亡场景完整测试：袁绍被何进处死")
+    log("="*70)
+    log(f"后端 URL: {BASE_URL}")
+    log(f"Story ID: {STORY_ID}")
     
     results = {
         'setup_characters': False,
         'death_scenario': False,
         'verify_state': False,
     }
-    
-    # 步骤1: 创建角色和地点
-    results['setup_characters'] = setup_characters()
-    
-    # 步骤2: 测试死亡场景
-    results['death_scenario'] = test_death_scenario()
-    
-    # 步骤3: 验证状态
-    results['verify_state'] = verify_death_state()
+
+    # 草稿批量提交后再验证状态；共享一个客户端连接池
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        timeout=90.0,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+    ) as client:
+        # 步骤1+2: 两条草稿一次批量提交（服务端按顺序处理）
+        status, batch_results = await run_draft_batch(client)
+        setup_result = batch_results[0] if len(batch_results) > 0 else {}
+        death_result = batch_results[1] if len(batch_results) > 1 else {}
+        results['setup_characters'] = check_setup_result(status, setup_result)
+        results['death_scenario'] = check_death_result(status, death_result)
+
+        # 步骤3: 验证状态
+        results['verify_state'] = await verify_death_state(client)
     
     # 汇总
     print_section("测试结果汇总")
@@ -282,23 +306,24 @@ def main():
     
     for name, result in results.items():
         status = "✅ 通过" if result else "❌ 失败"
-        print(f"  {name:20} {status}")
+        log(f"  {name:20} {status}")
     
-    print(f"\n总计: {passed}/{total} 测试通过")
+    log(f"\n总计: {passed}/{total} 测试通过")
     
     if passed == total:
-        print("\n🎉 所有测试通过！死亡场景处理正常。")
+        log("\n🎉 所有测试通过！死亡场景处理正常。")
         return 0
     else:
-        print(f"\n⚠️  有 {total - passed} 个测试未通过")
-        print("\n💡 提示:")
-        print("   - 如果返回 ASK_USER，说明系统正确识别了需要澄清的问题")
-        print("   - 在实际使用中，用户需要回答这些问题以继续")
-        print("   - 或者可以在草稿中更明确地指定角色ID和地点ID")
+        log(f"\n⚠️  有 {total - passed} 个测试未通过")
+        log("\n💡 提示:")
+        log("   - 如果返回 ASK_USER，说明系统正确识别了需要澄清的问题")
+        log("   - 在实际使用中，用户需要回答这些问题以继续")
+        log("   - 或者可以在草稿中更明确地指定角色ID和地点ID")
         return 1
 
 
 if __name__ == "__main__":
-    import sys
-    sys.exit(main())
+    code = asyncio.run(main())
+    flush_logs()
+    sys.exit(code)
 
@@ -9,34 +9,8 @@ from pathlib import Path
 backend_path = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_path.parent))
 
-from backend.extractor import EventExtractor
-from backend.models import (
-    CanonicalState,
-    MetaInfo,
-    TimeState,
-    TimeAnchor,
-    PlayerState,
-    Entities,
-    Character,
-    Location,
-    QuestState,
-    Constraints,
-)
-
-
-def create_test_state():
-    """创建测试用的 CanonicalState"""
-    luoyang = Location(id="luoyang", name="洛阳")
-    caocao = Character(id="caocao", name="曹操", location_id="luoyang", alive=True)
-    
-    return CanonicalState(
-        meta=MetaInfo(story_id="test", turn=0),
-        time=TimeState(calendar="建安三年春", anchor=TimeAnchor(label="建安三年春", order=10)),
-        player=PlayerState(id="player_001", name="玩家", location_id="luoyang", inventory=[], party=[]),
-        entities=Entities(characters={"caocao": caocao}, items={}, locations={"luoyang": luoyang}),
-        quest=QuestState(),
-        constraints=Constraints(),
-    )
+from _extractor_singleton import get_extractor, aclose_extractor
+from _test_fixtures import make_test_state
 
 
 async def test():
@@ -45,31 +19,28 @@ async def test():
     print("Event Extractor 简单测试")
     print("=" * 60)
     
-    extractor = EventExtractor()
-    state = create_test_state()
+    extractor = get_extractor()
+    state = make_test_state()
     
     user_message = "玩家向曹操打招呼"
     assistant_draft = "玩家向曹操打招呼，曹操点头回应。"
     
     print(f"\n用户消息: {user_message}")
     print(f"助手草稿: {assistant_draft}")
-    print(f"\n正在调用 LLM...")
+    print(f"\n正在流式调用 LLM（事件完整到达即打印）...")
     
     try:
-        result = await extractor.extract_events(
+        # 流式路径：不等整个响应结束，首个事件一到就能看到结果。
+        # 澄清问题（open_questions）只在完整模式 extract_events 返回
+        count = 0
+        async for event in extractor.extract_events_stream(
             canonical_state=state,
             user_message=user_message,
             assistant_draft=assistant_draft,
             turn=1,
-        )
-        
-        print(f"\n✅ 提取成功!")
-        print(f"   事件数量: {len(result.events)}")
-        print(f"   需要用户输入: {result.requires_user_input}")
-        
-        if result.events:
-            event = result.events[0]
-            print(f"\n   事件详情:")
+        ):
+            count += 1
+            print(f"\n   事件 {count}（流式到达）:")
             print(f"     ID: {event.event_id}")
             print(f"     类型: {event.type}")
             print(f"     摘要: {event.summary}")
@@ -78,15 +49,15 @@ async def test():
             print(f"     地点: {event.where.location_id}")
             print(f"     参与者: {', '.join(event.who.actors)}")
         
-        if result.open_questions:
-            print(f"\n   澄清问题:")
-            for q in result.open_questions:
-                print(f"     - {q}")
+        print(f"\n✅ 提取完成!")
+        print(f"   事件数量: {count}")
         
     except Exception as e:
         print(f"\n❌ 失败: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await aclose_extractor()
 
 
 if __name__ == "__main__":
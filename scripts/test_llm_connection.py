@@ -5,6 +5,17 @@ import asyncio
 import sys
 from pathlib import Path
 
+# uvloop（libuv 事件循环）可用时换掉默认 asyncio 循环，
+# 大量 await（LLM/DB/HTTP）的脚本调度开销明显更低；未安装则保持默认
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+# 分隔条常量：避免每个横幅都在运行时重新拼一遍
+BAR = "=" * 50
+
 # 添加 backend 到路径
 backend_path = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_path.parent))
@@ -15,9 +26,9 @@ from backend.config import settings
 
 async def test_connection():
     """测试 LLM 连接"""
-    print("=" * 50)
+    print(BAR)
     print("测试 LLM 连接配置")
-    print("=" * 50)
+    print(BAR)
     
     # 检查配置
     print(f"\n📋 配置信息:")
@@ -44,12 +55,9 @@ async def test_connection():
     print("   注意: 这将实际调用 API，会消耗配额")
     
     try:
-        # 创建一个简单的测试请求
-        from openai import AsyncOpenAI
-        client = AsyncOpenAI(
-            api_key=extractor.api_key,
-            base_url=extractor.base_url,
-        )
+        # 复用 extractor 自带的 AsyncOpenAI 客户端（及其连接池），
+        # 不再为探测请求单独建一个客户端、单独付一次 TLS 握手
+        client = extractor.client
         
         response = await client.chat.completions.create(
             model=extractor.model,
@@ -71,9 +79,9 @@ async def test_connection():
         print(f"   - 网络连接问题")
         return
     
-    print("\n" + "=" * 50)
+    print(f"\n{BAR}")
     print("✅ 所有测试通过！LLM 连接正常")
-    print("=" * 50)
+    print(BAR)
 
 
 if __name__ == "__main__":
@@ -136,7 +136,7 @@ class TestAPIEndpoints:
         
         # 模拟 Repository
         mock_repository.get_state = AsyncMock(return_value=base_state)
-        mock_repository.append_event = AsyncMock()
+        mock_repository.append_events = AsyncMock()
         mock_repository.save_state = AsyncMock()
         mock_repository.list_recent_events = AsyncMock(return_value=[])
         
@@ -192,9 +192,50 @@ class TestAPIEndpoints:
             
             assert result.final_action == "PASS"
             assert result.state is not None
-            assert mock_repository.append_event.called
+            assert mock_repository.append_events.called
             assert mock_repository.save_state.called
 
+    @pytest.mark.asyncio
+    async def test_draft_process_batch_partial_failure(self, client, mock_repository, mock_extractor, mock_gate, base_state):
+        """测试 POST /draft/process_batch - 中途失败时保留已完成结果"""
+        from backend.extractor import ExtractionResult
+
+        mock_repository.get_state = AsyncMock(return_value=base_state)
+        mock_repository.append_events = AsyncMock()
+        mock_repository.save_state = AsyncMock()
+        mock_repository.list_recent_events = AsyncMock(return_value=[])
+
+        # 第一条草稿要求澄清（走 ASK_USER 短路），第二条抛异常
+        mock_extractor.extract_events = AsyncMock(side_effect=[
+            ExtractionResult(
+                events=[],
+                open_questions=["测试问题"],
+                requires_user_input=True,
+            ),
+            RuntimeError("LLM 调用失败"),
+        ])
+
+        from backend.api.routes import process_draft_batch
+        from backend.api.models import DraftBatchRequest, DraftItem
+
+        request = DraftBatchRequest(
+            story_id="test",
+            drafts=[
+                DraftItem(user_message="测试1", assistant_draft="草稿1"),
+                DraftItem(user_message="测试2", assistant_draft="草稿2"),
+            ],
+        )
+
+        result = await process_draft_batch(
+            request, repo=mock_repository, extractor=mock_extractor, gate=mock_gate
+        )
+
+        # 已完成的第一条结果保留，失败位置和原因标出
+        assert len(result.results) == 1
+        assert result.results[0].final_action == "ASK_USER"
+        assert result.failed_index == 1
+        assert result.error is not None and "LLM 调用失败" in result.error
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
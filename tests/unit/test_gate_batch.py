@@ -0,0 +1,129 @@
+"""
+Consistency Gate 批量校验 API 测试
+"""
+import pytest
+import sys
+from pathlib import Path
+
+# 添加 backend 到路径
+backend_path = Path(__file__).parent.parent.parent / "backend"
+sys.path.insert(0, str(backend_path.parent))
+
+from backend.gate import ConsistencyGate
+from backend.models import (
+    CanonicalState,
+    MetaInfo,
+    TimeState,
+    TimeAnchor,
+    PlayerState,
+    Entities,
+    Character,
+    Location,
+    QuestState,
+    Constraints,
+    Event,
+    EventTime,
+    EventLocation,
+    EventParticipants,
+    EventEvidence,
+    StatePatch,
+    EntityUpdate,
+)
+
+
+@pytest.fixture
+def gate():
+    """创建 ConsistencyGate 实例"""
+    return ConsistencyGate()
+
+
+@pytest.fixture
+def base_state():
+    """创建基础状态"""
+    luoyang = Location(id="luoyang", name="洛阳")
+    xuchang = Location(id="xuchang", name="许昌")
+
+    caocao = Character(
+        id="caocao",
+        name="曹操",
+        location_id="luoyang",
+        alive=True,
+    )
+
+    return CanonicalState(
+        meta=MetaInfo(story_id="test", turn=0),
+        time=TimeState(
+            calendar="建安三年春",
+            anchor=TimeAnchor(label="建安三年春", order=1)
+        ),
+        player=PlayerState(
+            id="player_001",
+            name="玩家",
+            location_id="luoyang",
+        ),
+        entities=Entities(
+            characters={"caocao": caocao},
+            locations={"luoyang": luoyang, "xuchang": xuchang},
+        ),
+        quest=QuestState(),
+        constraints=Constraints(),
+    )
+
+
+def make_travel_event(event_id: str, event_type: str = "TRAVEL") -> Event:
+    """构造一个曹操从洛阳到许昌的位置变更事件"""
+    return Event(
+        event_id=event_id,
+        turn=1,
+        time=EventTime(label="建安三年春", order=2),
+        where=EventLocation(location_id="xuchang"),
+        who=EventParticipants(actors=["caocao"]),
+        type=event_type,
+        summary="曹操前往许昌",
+        payload={
+            "character_id": "caocao",
+            "from_location_id": "luoyang",
+            "to_location_id": "xuchang",
+        } if event_type == "TRAVEL" else {},
+        state_patch=StatePatch(
+            entity_updates={
+                "caocao": EntityUpdate(
+                    entity_type="character",
+                    entity_id="caocao",
+                    updates={"location_id": "xuchang"}
+                )
+            }
+        ),
+        evidence=EventEvidence(source="test"),
+    )
+
+
+class TestValidateEventPatchBatch:
+    """批量校验多组候选事件补丁"""
+
+    def test_batch_returns_result_per_candidate(self, gate, base_state):
+        """测试：每组候选都返回一个校验结果"""
+        good = make_travel_event("evt_1_001")
+        bad = make_travel_event("evt_1_002", event_type="OTHER")
+
+        results = gate.validate_event_patch_batch(base_state, [[good], [bad]])
+
+        assert len(results) == 2
+        assert results[0].action == "PASS"
+        assert results[1].action != "PASS"
+
+    def test_batch_early_exit_stops_after_first_pass(self, gate, base_state):
+        """测试：early_exit 模式下，遇到 PASS 后跳过剩余候选"""
+        bad = make_travel_event("evt_1_001", event_type="OTHER")
+        good = make_travel_event("evt_1_002")
+        never_checked = make_travel_event("evt_1_003", event_type="OTHER")
+
+        results = gate.validate_event_patch_batch(
+            base_state,
+            [[bad], [good], [never_checked]],
+            early_exit=True,
+        )
+
+        assert len(results) == 2
+        assert results[0].action != "PASS"
+        assert results[1].action == "PASS"